@@ -152,7 +152,7 @@ def demo_api_usage():
     
     print_step(5, "OBTENER LISTA DE DONANTES")
     
-    print_curl_command("GET", f"{base_url}/api/donors?blood_type=A%2B&page=1&per_page=10",
+    print_curl_command("GET", f"{base_url}/api/donors?blood_type=A%2B&per_page=10",
                       headers={"Authorization": f"Bearer {user_token}"})
     
     print("\nRespuesta esperada:")
@@ -168,10 +168,8 @@ def demo_api_usage():
             }
         ],
         "pagination": {
-            "page": 1,
-            "pages": 1,
             "per_page": 10,
-            "total": 1
+            "next_cursor": None
         }
     }, indent=2))
     
@@ -324,7 +322,9 @@ def demo_api_usage():
     print("""
 Para probar la API completa:
 
-1. Iniciar el servidor:
+1. Inicializar la base de datos e iniciar el servidor:
+   flask --app registro init-db
+   flask --app registro init-admin
    python registro.py
 
 2. La API estará disponible en: http://localhost:5000
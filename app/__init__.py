@@ -1,10 +1,19 @@
-from flask import Flask, jsonify
+from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
+from sqlalchemy import CheckConstraint, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.schema import AddConstraint
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.exceptions import HTTPException
+from argon2 import PasswordHasher
 from app.models import db
 from app.routes.auth import auth_bp
 from app.routes.donors import donors_bp
 from app.routes.web import web_bp
+from app.utils.responses import json_response, ORJSONProvider
+from app.utils.cache import init_cache
+import click
 import os
 from datetime import timedelta
 from dotenv import load_dotenv
@@ -15,6 +24,7 @@ load_dotenv()
 def create_app(config_name='development'):
     """Factory function para crear la aplicación Flask"""
     app = Flask(__name__)
+    app.json = ORJSONProvider(app)
     
     # Configuración
     if config_name == 'testing':
@@ -24,13 +34,34 @@ def create_app(config_name='development'):
         app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///donors.db')
     
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    
+    # Pool dimensionado para los workers y executemany por lotes con psycopg2;
+    # SQLite conserva el pool por defecto de Flask-SQLAlchemy
+    database_url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    if database_url.get_backend_name() == 'postgresql':
+        engine_options = {
+            'pool_size': 20,
+            'max_overflow': 10,
+            'pool_recycle': 1800,
+            'pool_pre_ping': False
+        }
+        if database_url.get_driver_name() == 'psycopg2':
+            engine_options['executemany_mode'] = 'values_plus_batch'
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options
     app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'dev-secret-key-change-in-production')
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-change-in-production')
+    # Caché opcional (por ejemplo redis://localhost:6379/0); sin valor se desactiva
+    app.config['REDIS_URL'] = None if config_name == 'testing' else os.getenv('REDIS_URL')
     
     # Inicializar extensiones
     db.init_app(app)
     jwt = JWTManager(app)
+    init_cache(app)
+    if config_name == 'testing':
+        # argon2 con el coste mínimo: las pruebas no necesitan resistir fuerza bruta.
+        # La verificación lee los parámetros del propio hash, así que no cambia
+        app.extensions['password_hasher'] = PasswordHasher(time_cost=1, memory_cost=8, parallelism=1)
     
     # Registrar blueprints
     app.register_blueprint(auth_bp)
@@ -40,7 +71,7 @@ def create_app(config_name='development'):
     # Rutas básicas de la API
     @app.route('/api')
     def api_index():
-        return jsonify({
+        return json_response({
             'message': 'API de Registro de Donantes',
             'version': '1.0',
             'endpoints': {
@@ -51,26 +82,46 @@ def create_app(config_name='development'):
     
     @app.route('/health')
     def health():
-        return jsonify({'status': 'OK', 'message': 'Servicio funcionando correctamente'})
+        return json_response({'status': 'OK', 'message': 'Servicio funcionando correctamente'})
     
     # Manejo de errores JWT
     @jwt.expired_token_loader
     def expired_token_callback(jwt_header, jwt_payload):
-        return jsonify({'message': 'Token expirado'}), 401
+        return json_response({'message': 'Token expirado'}, 401)
     
     @jwt.invalid_token_loader
     def invalid_token_callback(error):
-        return jsonify({'message': 'Token inválido'}), 401
+        return json_response({'message': 'Token inválido'}, 401)
     
     @jwt.unauthorized_loader
     def missing_token_callback(error):
-        return jsonify({'message': 'Token de autorización requerido'}), 401
+        return json_response({'message': 'Token de autorización requerido'}, 401)
+    
+    # Manejo centralizado de errores no controlados
+    @app.errorhandler(SQLAlchemyError)
+    def database_error_handler(error):
+        db.session.rollback()
+        app.logger.exception(error)
+        return json_response({'message': 'Error interno del servidor'}, 500)
     
-    # Crear tablas
-    with app.app_context():
+    @app.errorhandler(Exception)
+    def internal_error_handler(error):
+        # Las excepciones HTTP (404, 405, ...) conservan su respuesta propia
+        if isinstance(error, HTTPException):
+            return error
+        app.logger.exception(error)
+        return json_response({'message': 'Error interno del servidor'}, 500)
+    
+    # Comandos de inicialización (ejecutar una vez en cada despliegue)
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Crea las tablas de la base de datos"""
         db.create_all()
-        
-        # Crear usuario administrador por defecto si no existe
+        click.echo('Tablas creadas')
+    
+    @app.cli.command('init-admin')
+    def init_admin_command():
+        """Crea el usuario administrador por defecto si no existe"""
         from app.models import User, UserRole
         
         # Obtener credenciales desde variables de entorno
@@ -78,15 +129,61 @@ def create_app(config_name='development'):
         admin_password = os.getenv('ADMIN_PASSWORD', 'Admin123!')
         
         admin_user = User.query.filter_by(email=admin_email).first()
-        if not admin_user:
-            admin_user = User(
-                email=admin_email,
-                role=UserRole.ADMIN
-            )
-            admin_user.set_password(admin_password)
-            db.session.add(admin_user)
-            db.session.commit()
-            print(f"Usuario administrador creado: {admin_email}")
+        if admin_user:
+            click.echo(f"El usuario administrador ya existe: {admin_email}")
+            return
+        
+        admin_user = User(
+            email=admin_email,
+            role=UserRole.ADMIN
+        )
+        admin_user.set_password(admin_password)
+        db.session.add(admin_user)
+        db.session.commit()
+        click.echo(f"Usuario administrador creado: {admin_email}")
+    
+    @app.cli.command('migrate-enum-values')
+    def migrate_enum_values_command():
+        """Convierte los nombres guardados por db.Enum (ADMIN, O_POSITIVE) en los valores del enum"""
+        from app.models import User, Donor, UserRole, BloodType
+        
+        is_postgresql = db.engine.dialect.name == 'postgresql'
+        columns = (
+            (User.__table__, 'role', UserRole, 20),
+            (Donor.__table__, 'blood_type', BloodType, 3),
+        )
+        
+        for table, column, enum_cls, length in columns:
+            # CASE role WHEN 'ADMIN' THEN 'administrador' ... ELSE role END
+            whens = ' '.join(f"WHEN '{member.name}' THEN '{member.value}'" for member in enum_cls)
+            converted = f'CASE {column}::text {whens} ELSE {column}::text END' if is_postgresql \
+                else f'CASE {column} {whens} ELSE {column} END'
+            if is_postgresql:
+                # db.Enum creó un tipo nativo con los nombres: se pasa a VARCHAR convirtiendo en el mismo paso
+                db.session.execute(text(
+                    f'ALTER TABLE {table.name} ALTER COLUMN {column} TYPE VARCHAR({length}) USING {converted}'
+                ))
+                db.session.execute(text(f'DROP TYPE IF EXISTS {enum_cls.__name__.lower()}'))
+            else:
+                names = ', '.join(f"'{member.name}'" for member in enum_cls)
+                db.session.execute(text(
+                    f'UPDATE {table.name} SET {column} = {converted} WHERE {column} IN ({names})'
+                ))
+        
+        if is_postgresql:
+            # create_all no añade restricciones a tablas existentes
+            inspector = inspect(db.session.connection())
+            for table, _, _, _ in columns:
+                existing = {c['name'] for c in inspector.get_check_constraints(table.name)}
+                for constraint in table.constraints:
+                    if isinstance(constraint, CheckConstraint) and constraint.name not in existing:
+                        db.session.execute(AddConstraint(constraint))
+        
+        db.session.commit()
+        click.echo('Valores de rol y tipo de sangre migrados')
+        if not is_postgresql:
+            click.echo('SQLite no permite añadir restricciones CHECK a una tabla existente; '
+                       'solo las tablas creadas con init-db las incluyen')
     
     return app
 
@@ -1,36 +1,102 @@
+from flask import current_app, has_app_context
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.sql import func
+from datetime import date
+import hashlib
+from werkzeug.security import check_password_hash
 from enum import Enum
+from collections import OrderedDict
+from threading import Lock
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError, InvalidHashError
 
 db = SQLAlchemy()
 
-class UserRole(Enum):
+# Parámetros de argon2id recomendados por OWASP (19 MiB, 2 iteraciones)
+_password_hasher = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1)
+
+def _get_password_hasher():
+    """Hasher de la aplicación activa (app.extensions) o el de parámetros OWASP"""
+    if has_app_context():
+        return current_app.extensions.get('password_hasher', _password_hasher)
+    return _password_hasher
+
+# Verificaciones exitosas recientes (hash, sha256 de la contraseña), en orden LRU.
+# Un cambio de contraseña produce un hash nuevo, por lo que las entradas
+# antiguas dejan de coincidir sin necesidad de invalidarlas
+_VERIFIED_CACHE_SIZE = 2048
+_verified_cache = OrderedDict()
+_verified_lock = Lock()
+
+def _verify_password(password_hash, password):
+    """Verifica con argon2 reutilizando los aciertos recientes"""
+    key = (password_hash, hashlib.sha256(password.encode()).digest())
+    with _verified_lock:
+        if key in _verified_cache:
+            _verified_cache.move_to_end(key)
+            return True
+    
+    try:
+        _password_hasher.verify(password_hash, password)
+    except (VerificationError, InvalidHashError):
+        # Los fallos no se memorizan: cada intento erróneo paga el coste completo
+        return False
+    
+    with _verified_lock:
+        _verified_cache[key] = True
+        if len(_verified_cache) > _VERIFIED_CACHE_SIZE:
+            _verified_cache.popitem(last=False)
+    return True
+
+def _today():
+    """Fecha actual; punto único para fijar el reloj en las pruebas"""
+    return date.today()
+
+def calculate_age(birth_date, today):
+    """Edad en años cumplidos, comparando (mes, día) sin aritmética de días"""
+    return today.year - birth_date.year - ((today.month, today.day) < (birth_date.month, birth_date.day))
+
+def _values_check(column, enum_cls):
+    """Restricción CHECK que limita la columna a los valores del enum"""
+    values = ', '.join(f"'{member.value}'" for member in enum_cls)
+    return f'{column} IN ({values})'
+
+class UserRole(str, Enum):
     ADMIN = "administrador"
     USER = "usuario"
 
 class User(db.Model):
     """Modelo de usuario con autenticación y roles"""
     __tablename__ = 'users'
+    __table_args__ = (
+        db.CheckConstraint(_values_check('role', UserRole), name='ck_users_role'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(255), nullable=False)
-    role = db.Column(db.Enum(UserRole), nullable=False, default=UserRole.USER)
+    role = db.Column(db.String(20), nullable=False, default=UserRole.USER.value)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=func.now(), server_default=func.now(), nullable=False)
+    updated_at = db.Column(db.DateTime, default=func.now(), server_default=func.now(), onupdate=func.now(), nullable=False)
     
     # Relación con donantes
     donors = db.relationship('Donor', backref='created_by_user', lazy=True)
     
     def set_password(self, password):
-        """Establece la contraseña hasheada"""
-        self.password_hash = generate_password_hash(password)
+        """Establece la contraseña hasheada con argon2id"""
+        self.password_hash = _get_password_hasher().hash(password)
     
     def check_password(self, password):
         """Verifica la contraseña"""
-        return check_password_hash(self.password_hash, password)
+        if not self.password_hash.startswith('$argon2'):
+            # Hash heredado de Werkzeug (pbkdf2/scrypt): se migra a argon2 al validar
+            if not check_password_hash(self.password_hash, password):
+                return False
+            self.set_password(password)
+            return True
+        
+        return _verify_password(self.password_hash, password)
     
     def is_admin(self):
         """Verifica si el usuario es administrador"""
@@ -41,16 +107,16 @@ class User(db.Model):
         return {
             'id': self.id,
             'email': self.email,
-            'role': self.role.value,
+            'role': self.role,
             'is_active': self.is_active,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
     
     def __repr__(self):
         return f'<User {self.email}>'
 
-class BloodType(Enum):
+class BloodType(str, Enum):
     A_POSITIVE = "A+"
     A_NEGATIVE = "A-"
     B_POSITIVE = "B+"
@@ -63,6 +129,14 @@ class BloodType(Enum):
 class Donor(db.Model):
     """Modelo de donante de sangre"""
     __tablename__ = 'donors'
+    __table_args__ = (
+        db.CheckConstraint(_values_check('blood_type', BloodType), name='ck_donors_blood_type'),
+        # Índices compuestos para los filtros del listado ordenado por id
+        db.Index('ix_donors_blood_type_id', 'blood_type', 'id'),
+        db.Index('ix_donors_eligible_id', 'is_eligible', 'id'),
+        db.Index('ix_donors_created_by_id', 'created_by', 'id'),
+        db.Index('ix_donors_created_by_eligible_id', 'created_by', 'is_eligible', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     first_name = db.Column(db.String(100), nullable=False)
@@ -70,26 +144,34 @@ class Donor(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
     phone = db.Column(db.String(20), nullable=True)
     birth_date = db.Column(db.Date, nullable=False)
-    blood_type = db.Column(db.Enum(BloodType), nullable=False)
+    blood_type = db.Column(db.String(3), nullable=False)
     weight = db.Column(db.Float, nullable=False)  # en kg
     last_donation_date = db.Column(db.Date, nullable=True)
     is_eligible = db.Column(db.Boolean, default=True, nullable=False)
     medical_notes = db.Column(db.Text, nullable=True)
     
     # Campos de auditoría
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=func.now(), server_default=func.now(), nullable=False)
+    updated_at = db.Column(db.DateTime, default=func.now(), server_default=func.now(), onupdate=func.now(), nullable=False)
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     
-    def get_age(self):
+    def __init__(self, **kwargs):
+        # El default de la columna solo se aplica al insertar; se fija ya para
+        # que un donante recién construido sea evaluable sin guardarlo
+        kwargs.setdefault('is_eligible', True)
+        super().__init__(**kwargs)
+    
+    def get_age(self, today=None):
         """Calcula la edad del donante"""
-        today = datetime.now().date()
-        return today.year - self.birth_date.year - ((today.month, today.day) < (self.birth_date.month, self.birth_date.day))
+        return calculate_age(self.birth_date, today or _today())
     
-    def is_eligible_for_donation(self):
+    def is_eligible_for_donation(self, today=None):
         """Verifica si el donante es elegible para donar"""
-        age = self.get_age()
-        
+        today = today or _today()
+        return self._check_eligibility(self.get_age(today), today)
+    
+    def _check_eligibility(self, age, today):
+        """Aplica los criterios de elegibilidad con la edad ya calculada"""
         # Criterios básicos de elegibilidad
         if not self.is_eligible:
             return False, "Donante marcado como no elegible"
@@ -102,34 +184,36 @@ class Donor(db.Model):
         
         # Verificar última donación (mínimo 8 semanas entre donaciones)
         if self.last_donation_date:
-            days_since_last = (datetime.now().date() - self.last_donation_date).days
+            days_since_last = (today - self.last_donation_date).days
             if days_since_last < 56:  # 8 semanas = 56 días
                 return False, f"Debe esperar {56 - days_since_last} días más para donar"
         
         return True, "Elegible para donación"
     
-    def to_dict(self):
+    def to_dict(self, today=None):
         """Convierte el modelo a diccionario"""
-        eligible, reason = self.is_eligible_for_donation()
+        today = today or _today()
+        age = self.get_age(today)
+        eligible, reason = self._check_eligibility(age, today)
         return {
             'id': self.id,
             'first_name': self.first_name,
             'last_name': self.last_name,
             'email': self.email,
             'phone': self.phone,
-            'birth_date': self.birth_date.isoformat() if self.birth_date else None,
-            'age': self.get_age(),
-            'blood_type': self.blood_type.value,
+            'birth_date': self.birth_date,
+            'age': age,
+            'blood_type': self.blood_type,
             'weight': self.weight,
-            'last_donation_date': self.last_donation_date.isoformat() if self.last_donation_date else None,
+            'last_donation_date': self.last_donation_date,
             'is_eligible': self.is_eligible,
             'medical_notes': self.medical_notes,
             'eligibility_status': {
                 'eligible': eligible,
                 'reason': reason
             },
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
             'created_by': self.created_by
         }
     
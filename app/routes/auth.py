@@ -1,197 +1,259 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, current_app, stream_with_context
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from app.models import User, UserRole, db
-from app.utils.auth import AuthUtils, get_current_user, admin_required
+from app.models import User, Donor, UserRole, db
+from app.utils.auth import AuthUtils, get_current_user, admin_required, current_admin_is_valid
+from app.utils.responses import json_response, dumps
 from email_validator import validate_email, EmailNotValidError
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.exc import IntegrityError
 from datetime import timedelta
+import orjson
+import re
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
+# Mensajes de error estáticos, serializados una sola vez al importar el módulo
+_STATIC = {key: orjson.dumps({'message': message}) for key, message in {
+    'no_data': 'No se proporcionaron datos',
+    'email_pw_required': 'Email y contraseña son requeridos',
+    'invalid_email': 'Formato de email inválido',
+    'invalid_role_options': 'Rol inválido. Use "usuario" o "administrador"',
+    'invalid_role': 'Rol inválido',
+    'email_in_use': 'El email ya está en uso',
+    'user_not_found': 'Usuario no encontrado',
+    'delete_self': 'No puede eliminar su propia cuenta',
+    'admin_revoked': 'Acceso denegado. Se requieren permisos de administrador'
+}.items()}
+
+def _err(key, status):
+    """Devuelve uno de los mensajes de error precalculados"""
+    return current_app.response_class(_STATIC[key], status=status, mimetype='application/json')
+
+# Roles aceptados en las peticiones
+_ROLE_MAP = {role.value: role for role in UserRole}
+
+# Columnas expuestas en los listados de usuarios (mismo orden que User.to_dict)
+USER_COLUMNS = (User.id, User.email, User.role, User.is_active, User.created_at, User.updated_at)
+
+def _user_row_to_dict(row):
+    """Convierte una fila de USER_COLUMNS al formato de User.to_dict"""
+    user_id, email, role, is_active, created_at, updated_at = row
+    return {
+        'id': user_id,
+        'email': email,
+        'role': role,
+        'is_active': is_active,
+        'created_at': created_at,
+        'updated_at': updated_at
+    }
+
+# Aceptación rápida de user@dominio.tld sin puntos ni guiones en posiciones dudosas;
+# cualquier otra dirección pasa por email_validator
+_EMAIL_RE = re.compile(
+    r'^[A-Za-z0-9_%+\-]+(?:\.[A-Za-z0-9_%+\-]+)*'
+    r'@(?:[A-Za-z0-9](?:[A-Za-z0-9\-]{0,61}[A-Za-z0-9])?\.)+[A-Za-z]{2,63}$'
+)
+
+def _validate_email_fast(email):
+    """Valida el formato del email, recurriendo a email_validator si la regex no lo acepta"""
+    if len(email) <= 254 and email.find('@') <= 64 and _EMAIL_RE.match(email):
+        return True
+    try:
+        validate_email(email, check_deliverability=False)
+        return True
+    except EmailNotValidError:
+        return False
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     """Registro de nuevos usuarios"""
-    try:
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({'message': 'No se proporcionaron datos'}), 400
-        
-        email = data.get('email', '').strip().lower()
-        password = data.get('password', '')
-        role = data.get('role', 'usuario')
-        
-        # Validaciones básicas
-        if not email or not password:
-            return jsonify({'message': 'Email y contraseña son requeridos'}), 400
-        
-        # Validar formato de email
-        try:
-            validate_email(email)
-        except EmailNotValidError:
-            return jsonify({'message': 'Formato de email inválido'}), 400
-        
-        # Validar rol
-        user_role = UserRole.USER
-        if role == 'administrador':
-            user_role = UserRole.ADMIN
-        elif role not in ['usuario', 'administrador']:
-            return jsonify({'message': 'Rol inválido. Use "usuario" o "administrador"'}), 400
-        
-        # Crear usuario
-        user, message = AuthUtils.create_user(email, password, user_role)
-        
-        if not user:
-            return jsonify({'message': message}), 400
-        
-        return jsonify({
-            'message': 'Usuario registrado exitosamente',
-            'user': user.to_dict()
-        }), 201
-        
-    except Exception as e:
-        return jsonify({'message': 'Error interno del servidor', 'error': str(e)}), 500
+    data = request.get_json()
+    
+    if not data:
+        return _err('no_data', 400)
+    
+    email = data.get('email', '').strip().lower()
+    password = data.get('password', '')
+    role = data.get('role', 'usuario')
+    
+    # Validaciones básicas
+    if not email or not password:
+        return _err('email_pw_required', 400)
+    
+    # Validar formato de email
+    if not _validate_email_fast(email):
+        return _err('invalid_email', 400)
+    
+    # Validar rol
+    user_role = _ROLE_MAP.get(role) if isinstance(role, str) else None
+    if user_role is None:
+        return _err('invalid_role_options', 400)
+    
+    # Crear usuario
+    user, message = AuthUtils.create_user(email, password, user_role)
+    
+    if not user:
+        return json_response({'message': message}, 400)
+    
+    return json_response({
+        'message': 'Usuario registrado exitosamente',
+        'user': user.to_dict()
+    }, 201)
 
 @auth_bp.route('/login', methods=['POST'])
 def login():
     """Autenticación de usuarios"""
-    try:
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({'message': 'No se proporcionaron datos'}), 400
-        
-        email = data.get('email', '').strip().lower()
-        password = data.get('password', '')
-        
-        if not email or not password:
-            return jsonify({'message': 'Email y contraseña son requeridos'}), 400
-        
-        # Autenticar usuario
-        user, message = AuthUtils.authenticate_user(email, password)
-        
-        if not user:
-            return jsonify({'message': message}), 401
-        
-        # Crear token JWT
-        access_token = create_access_token(
-            identity=user.id,
-            expires_delta=timedelta(hours=24)
-        )
-        
-        return jsonify({
-            'message': 'Login exitoso',
-            'access_token': access_token,
-            'user': user.to_dict()
-        }), 200
-        
-    except Exception as e:
-        return jsonify({'message': 'Error interno del servidor', 'error': str(e)}), 500
+    data = request.get_json()
+    
+    if not data:
+        return _err('no_data', 400)
+    
+    email = data.get('email', '').strip().lower()
+    password = data.get('password', '')
+    
+    if not email or not password:
+        return _err('email_pw_required', 400)
+    
+    # Autenticar usuario
+    user, message = AuthUtils.authenticate_user(email, password)
+    
+    if not user:
+        return json_response({'message': message}, 401)
+    
+    # Crear token JWT
+    access_token = create_access_token(
+        identity=user.id,
+        additional_claims={'role': UserRole(user.role).value, 'active': user.is_active},
+        expires_delta=timedelta(hours=24)
+    )
+    
+    return json_response({
+        'message': 'Login exitoso',
+        'access_token': access_token,
+        'user': user.to_dict()
+    }, 200)
 
 @auth_bp.route('/profile', methods=['GET'])
 @jwt_required()
 def get_profile():
     """Obtiene el perfil del usuario actual"""
-    try:
-        current_user = get_current_user()
-        
-        if not current_user:
-            return jsonify({'message': 'Usuario no encontrado'}), 404
-        
-        return jsonify({
-            'message': 'Perfil obtenido exitosamente',
-            'user': current_user.to_dict()
-        }), 200
-        
-    except Exception as e:
-        return jsonify({'message': 'Error interno del servidor', 'error': str(e)}), 500
+    current_user = get_current_user()
+    
+    if not current_user:
+        return _err('user_not_found', 404)
+    
+    return json_response({
+        'message': 'Perfil obtenido exitosamente',
+        'user': current_user.to_dict()
+    }, 200)
 
 @auth_bp.route('/users', methods=['GET'])
 @admin_required
 def get_all_users():
     """Obtiene todos los usuarios (solo administradores)"""
-    try:
-        users = User.query.all()
-        return jsonify({
-            'message': 'Usuarios obtenidos exitosamente',
-            'users': [user.to_dict() for user in users],
-            'total': len(users)
-        }), 200
-        
-    except Exception as e:
-        return jsonify({'message': 'Error interno del servidor', 'error': str(e)}), 500
+    # Las rutas de administración no se fían solo del claim: el token dura
+    # 24 h y el admin puede haber sido desactivado o degradado entretanto
+    if not current_admin_is_valid():
+        return _err('admin_revoked', 403)
+    
+    # Se transmite el arreglo fila a fila: solo se leen las columnas
+    # necesarias y la memoria no crece con el número de usuarios
+    def generate():
+        yield b'{"message":"Usuarios obtenidos exitosamente","users":['
+        total = 0
+        for row in db.session.query(*USER_COLUMNS).yield_per(500):
+            if total:
+                yield b','
+            yield dumps(_user_row_to_dict(row))
+            total += 1
+        yield b'],"total":%d}' % total
+    
+    return current_app.response_class(stream_with_context(generate()), mimetype='application/json')
 
 @auth_bp.route('/users/<int:user_id>', methods=['PUT'])
 @admin_required
 def update_user(user_id):
     """Actualiza un usuario (solo administradores)"""
-    try:
-        user = User.query.get_or_404(user_id)
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({'message': 'No se proporcionaron datos'}), 400
-        
-        # Actualizar campos permitidos
-        if 'email' in data:
-            email = data['email'].strip().lower()
-            try:
-                validate_email(email)
-                # Verificar que el email no esté en uso por otro usuario
-                existing_user = User.query.filter_by(email=email).filter(User.id != user_id).first()
-                if existing_user:
-                    return jsonify({'message': 'El email ya está en uso'}), 400
-                user.email = email
-            except EmailNotValidError:
-                return jsonify({'message': 'Formato de email inválido'}), 400
-        
-        if 'role' in data:
-            role = data['role']
-            if role == 'administrador':
-                user.role = UserRole.ADMIN
-            elif role == 'usuario':
-                user.role = UserRole.USER
+    # Igual que get_all_users: se comprueba el admin actual en la base de datos
+    if not current_admin_is_valid():
+        return _err('admin_revoked', 403)
+    
+    data = request.get_json()
+    
+    if not data:
+        return _err('no_data', 400)
+    
+    # Recopilar los campos permitidos
+    changes = {}
+    if 'email' in data:
+        email = data['email'].strip().lower()
+        if not _validate_email_fast(email):
+            return _err('invalid_email', 400)
+        changes['email'] = email
+    
+    if 'role' in data:
+        role = data['role']
+        user_role = _ROLE_MAP.get(role) if isinstance(role, str) else None
+        if user_role is None:
+            return _err('invalid_role', 400)
+        changes['role'] = user_role
+    
+    if 'is_active' in data:
+        changes['is_active'] = bool(data['is_active'])
+    
+    select_user = select(*USER_COLUMNS).where(User.id == user_id)
+    if changes:
+        stmt = update(User).where(User.id == user_id).values(**changes)
+        try:
+            if db.session.get_bind().dialect.full_returning:
+                # UPDATE ... RETURNING: una sola ida y vuelta a la base de datos
+                row = db.session.execute(stmt.returning(*USER_COLUMNS)).first()
             else:
-                return jsonify({'message': 'Rol inválido'}), 400
-        
-        if 'is_active' in data:
-            user.is_active = bool(data['is_active'])
-        
-        db.session.commit()
-        
-        return jsonify({
-            'message': 'Usuario actualizado exitosamente',
-            'user': user.to_dict()
-        }), 200
-        
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'message': 'Error interno del servidor', 'error': str(e)}), 500
+                result = db.session.execute(stmt)
+                row = db.session.execute(select_user).first() if result.rowcount else None
+            db.session.commit()
+        except IntegrityError:
+            # El índice único de email detecta si ya está en uso por otro usuario
+            db.session.rollback()
+            return _err('email_in_use', 400)
+    else:
+        row = db.session.execute(select_user).first()
+    
+    if row is None:
+        return _err('user_not_found', 404)
+    
+    return json_response({
+        'message': 'Usuario actualizado exitosamente',
+        'user': _user_row_to_dict(row)
+    }, 200)
 
 @auth_bp.route('/users/<int:user_id>', methods=['DELETE'])
 @admin_required
 def delete_user(user_id):
     """Elimina un usuario (solo administradores)"""
-    try:
-        current_user = get_current_user()
-        
-        # No permitir que el admin se elimine a sí mismo
-        if current_user.id == user_id:
-            return jsonify({'message': 'No puede eliminar su propia cuenta'}), 400
-        
-        user = User.query.get_or_404(user_id)
-        
-        # Verificar si el usuario tiene donantes asociados
-        if user.donors:
-            return jsonify({
-                'message': 'No se puede eliminar el usuario porque tiene donantes asociados',
-                'donors_count': len(user.donors)
-            }), 400
-        
-        db.session.delete(user)
-        db.session.commit()
-        
-        return jsonify({'message': 'Usuario eliminado exitosamente'}), 200
-        
-    except Exception as e:
+    # Igual que get_all_users: se comprueba el admin actual en la base de datos
+    if not current_admin_is_valid():
+        return _err('admin_revoked', 403)
+    
+    # No permitir que el admin se elimine a sí mismo
+    if get_jwt_identity() == user_id:
+        return _err('delete_self', 400)
+    
+    # Verificar si el usuario tiene donantes asociados con un COUNT, sin
+    # cargar el usuario ni su colección de donantes
+    donors_count = db.session.scalar(
+        select(func.count()).select_from(Donor).where(Donor.created_by == user_id)
+    )
+    if donors_count:
+        return json_response({
+            'message': 'No se puede eliminar el usuario porque tiene donantes asociados',
+            'donors_count': donors_count
+        }, 400)
+    
+    result = db.session.execute(delete(User).where(User.id == user_id))
+    if not result.rowcount:
         db.session.rollback()
-        return jsonify({'message': 'Error interno del servidor', 'error': str(e)}), 500
\ No newline at end of file
+        return _err('user_not_found', 404)
+    db.session.commit()
+    
+    return json_response({'message': 'Usuario eliminado exitosamente'}, 200)
\ No newline at end of file
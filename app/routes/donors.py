@@ -1,67 +1,114 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required
-from app.models import Donor, BloodType, db
-from app.utils.auth import get_current_user, admin_required, check_user_permissions
+from app.models import Donor, BloodType, db, calculate_age
+from app.utils.auth import get_current_user, admin_required, check_user_permissions, current_admin_is_valid
+from app.utils.cache import STATS_KEY, STATS_TTL, cache_get, cache_set, cache_delete
+from app.utils.responses import dumps
 from email_validator import validate_email, EmailNotValidError
-from datetime import datetime, date
+from sqlalchemy import case, func, select
+from sqlalchemy.exc import IntegrityError
+from datetime import date
 import re
 
 donors_bp = Blueprint('donors', __name__, url_prefix='/api/donors')
 
-def validate_donor_data(data, is_update=False):
-    """Valida los datos del donante"""
+# Expresiones regulares compiladas una sola vez al importar el módulo
+NAME_RE = re.compile(r'^[a-zA-ZáéíóúÁÉÍÓÚñÑ\s]+$')
+NON_DIGIT_RE = re.compile(r'[^\d]')
+
+# Tipos de sangre válidos y su mensaje de error, calculados al importar
+BLOOD_TYPE_VALUES = frozenset(bt.value for bt in BloodType)
+BLOOD_TYPE_ERROR = f'Tipo de sangre inválido. Valores válidos: {", ".join(bt.value for bt in BloodType)}'
+
+# Rangos de edad de las estadísticas: (etiqueta, edad a partir de la cual
+# se pasa al siguiente rango); los mayores caen en OLDEST_AGE_BUCKET
+AGE_BUCKETS = (
+    ('16-25', 26),
+    ('26-35', 36),
+    ('36-45', 46),
+    ('46-55', 56),
+    ('56-65', 66),
+)
+OLDEST_AGE_BUCKET = '66+'
+AGE_RANGE_LABELS = tuple(label for label, _ in AGE_BUCKETS) + (OLDEST_AGE_BUCKET,)
+
+# Campos de texto del donante; en los opcionales también se admite null
+TEXT_FIELDS = ('first_name', 'last_name', 'email', 'phone', 'blood_type', 'medical_notes')
+
+# Tamaño máximo de un lote de /api/donors/bulk
+MAX_BULK_DONORS = 500
+
+def validate_donor_data(data, is_update=False, today=None):
+    """Valida los datos del donante y devuelve (errores, datos normalizados)"""
     errors = []
+    today = today or date.today()
+    # Cada texto se recorta una sola vez; las validaciones y la asignación al
+    # modelo trabajan sobre estos valores
+    clean = {key: value.strip() if isinstance(value, str) else value for key, value in data.items()}
     
     # Validar campos requeridos (solo para creación)
     if not is_update:
         required_fields = ['first_name', 'last_name', 'email', 'birth_date', 'blood_type', 'weight']
         for field in required_fields:
-            if not data.get(field):
+            if not clean.get(field):
                 errors.append(f'El campo {field} es requerido')
     
+    # Validar tipos; un campo con tipo incorrecto no pasa al resto de validaciones
+    for field in TEXT_FIELDS:
+        if clean.get(field) is not None and not isinstance(clean[field], str):
+            errors.append(f'El campo {field} debe ser texto')
+            del clean[field]
+    if 'is_eligible' in clean and not isinstance(clean['is_eligible'], bool):
+        errors.append('El campo is_eligible debe ser true o false')
+    
     # Validar email si está presente
-    if 'email' in data and data['email']:
+    if clean.get('email'):
         try:
-            validate_email(data['email'])
+            # Sin consulta DNS de entregabilidad; se reutiliza la forma normalizada
+            # (en minúsculas, igual que los emails de usuario) para la unicidad
+            info = validate_email(clean['email'], check_deliverability=False)
+            clean['email'] = info.normalized.lower()
         except EmailNotValidError:
             errors.append('Formato de email inválido')
     
     # Validar nombres
     for field in ['first_name', 'last_name']:
-        if field in data and data[field]:
-            if len(data[field].strip()) < 2:
+        value = clean.get(field)
+        if value:
+            if len(value) < 2:
                 errors.append(f'{field} debe tener al menos 2 caracteres')
-            if not re.match(r'^[a-zA-ZáéíóúÁÉÍÓÚñÑ\s]+$', data[field].strip()):
+            if not NAME_RE.match(value):
                 errors.append(f'{field} solo puede contener letras y espacios')
     
     # Validar teléfono
-    if 'phone' in data and data['phone']:
-        phone = re.sub(r'[^\d]', '', data['phone'])
+    if clean.get('phone'):
+        phone = NON_DIGIT_RE.sub('', clean['phone'])
         if len(phone) < 10:
             errors.append('El teléfono debe tener al menos 10 dígitos')
     
     # Validar fecha de nacimiento
-    if 'birth_date' in data and data['birth_date']:
+    if clean.get('birth_date'):
         try:
-            birth_date = datetime.strptime(data['birth_date'], '%Y-%m-%d').date()
-            age = (date.today() - birth_date).days // 365
+            birth_date = date.fromisoformat(clean['birth_date'])
+            clean['birth_date'] = birth_date
+            age = calculate_age(birth_date, today)
             if age < 16:
                 errors.append('El donante debe tener al menos 16 años')
             if age > 70:
                 errors.append('El donante no puede tener más de 70 años')
-        except ValueError:
+        except (ValueError, TypeError):
             errors.append('Formato de fecha inválido. Use YYYY-MM-DD')
     
     # Validar tipo de sangre
-    if 'blood_type' in data and data['blood_type']:
-        valid_blood_types = [bt.value for bt in BloodType]
-        if data['blood_type'] not in valid_blood_types:
-            errors.append(f'Tipo de sangre inválido. Valores válidos: {", ".join(valid_blood_types)}')
+    if clean.get('blood_type'):
+        if clean['blood_type'] not in BLOOD_TYPE_VALUES:
+            errors.append(BLOOD_TYPE_ERROR)
     
     # Validar peso
-    if 'weight' in data and data['weight'] is not None:
+    if clean.get('weight') is not None:
         try:
-            weight = float(data['weight'])
+            weight = float(clean['weight'])
+            clean['weight'] = weight
             if weight < 45:
                 errors.append('El peso mínimo es 45 kg')
             if weight > 200:
@@ -70,311 +117,369 @@ def validate_donor_data(data, is_update=False):
             errors.append('El peso debe ser un número válido')
     
     # Validar fecha de última donación
-    if 'last_donation_date' in data and data['last_donation_date']:
+    if clean.get('last_donation_date'):
         try:
-            last_donation = datetime.strptime(data['last_donation_date'], '%Y-%m-%d').date()
-            if last_donation > date.today():
+            last_donation = date.fromisoformat(clean['last_donation_date'])
+            clean['last_donation_date'] = last_donation
+            if last_donation > today:
                 errors.append('La fecha de última donación no puede ser futura')
-        except ValueError:
+        except (ValueError, TypeError):
             errors.append('Formato de fecha de última donación inválido. Use YYYY-MM-DD')
     
-    return errors
+    return errors, clean
+
+def email_taken(email, exclude_id=None):
+    """Indica si otro donante ya usa el email, con un EXISTS sobre el índice único"""
+    query = Donor.query.filter(Donor.email == email)
+    if exclude_id is not None:
+        query = query.filter(Donor.id != exclude_id)
+    return db.session.query(query.exists()).scalar()
+
+def _donor_values(clean, created_by):
+    """Columnas de un donante nuevo a partir de los datos ya validados"""
+    return {
+        'first_name': clean['first_name'],
+        'last_name': clean['last_name'],
+        'email': clean['email'],
+        'phone': clean.get('phone') or None,
+        'birth_date': clean['birth_date'],
+        'blood_type': clean['blood_type'],
+        'weight': clean['weight'],
+        'last_donation_date': clean.get('last_donation_date') or None,
+        'is_eligible': clean.get('is_eligible', True),
+        'medical_notes': clean.get('medical_notes') or None,
+        'created_by': created_by
+    }
+
+def _is_email_conflict(error):
+    """Indica si un IntegrityError proviene del índice único de donors.email"""
+    # SQLite: "UNIQUE constraint failed: donors.email";
+    # PostgreSQL: 'duplicate key value violates unique constraint "ix_donors_email"'
+    message = str(error.orig).lower()
+    return 'unique' in message and 'email' in message
+
+def _years_ago(today, years):
+    """Devuelve la fecha de hace `years` años (el 29 de febrero pasa al 28)"""
+    try:
+        return today.replace(year=today.year - years)
+    except ValueError:
+        return today.replace(year=today.year - years, day=28)
 
 @donors_bp.route('', methods=['POST'])
 @jwt_required()
 def create_donor():
     """Crea un nuevo donante"""
-    try:
-        current_user = get_current_user()
-        if not current_user:
-            return jsonify({'message': 'Usuario no autenticado'}), 401
-        
-        data = request.get_json()
-        if not data:
-            return jsonify({'message': 'No se proporcionaron datos'}), 400
-        
-        # Validar datos
-        errors = validate_donor_data(data)
+    current_user = get_current_user()
+    if not current_user:
+        return jsonify({'message': 'Usuario no autenticado'}), 401
+    
+    data = request.get_json()
+    if not data:
+        return jsonify({'message': 'No se proporcionaron datos'}), 400
+    
+    # Validar datos
+    errors, clean = validate_donor_data(data)
+    if errors:
+        return jsonify({'message': 'Errores de validación', 'errors': errors}), 400
+    
+    # Verificar si el email ya existe
+    if email_taken(clean['email']):
+        return jsonify({'message': 'Ya existe un donante con este email'}), 409
+    
+    # Crear donante
+    donor = Donor(**_donor_values(clean, current_user.id))
+    
+    db.session.add(donor)
+    db.session.commit()
+    cache_delete(STATS_KEY)
+    
+    return jsonify({
+        'message': 'Donante registrado exitosamente',
+        'donor': donor.to_dict()
+    }), 201
+
+@donors_bp.route('/bulk', methods=['POST'])
+@jwt_required()
+def create_donors_bulk():
+    """Crea varios donantes en una sola transacción"""
+    current_user = get_current_user()
+    if not current_user:
+        return jsonify({'message': 'Usuario no autenticado'}), 401
+    
+    data = request.get_json()
+    entries = data.get('donors') if isinstance(data, dict) else None
+    if not entries or not isinstance(entries, list):
+        return jsonify({'message': 'Se requiere una lista de donantes en "donors"'}), 400
+    if len(entries) > MAX_BULK_DONORS:
+        return jsonify({'message': f'Máximo {MAX_BULK_DONORS} donantes por petición'}), 400
+    
+    # Validar cada entrada; se conservan los índices para el resultado
+    results = []
+    valid = []
+    today = date.today()
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            results.append({'index': index, 'status': 'error', 'errors': ['Entrada inválida']})
+            continue
+        errors, clean = validate_donor_data(entry, today=today)
         if errors:
-            return jsonify({'message': 'Errores de validación', 'errors': errors}), 400
-        
-        # Verificar si el email ya existe
-        existing_donor = Donor.query.filter_by(email=data['email']).first()
-        if existing_donor:
+            results.append({'index': index, 'status': 'error', 'errors': errors})
+        else:
+            valid.append((index, clean))
+    
+    # Emails ya registrados: una sola consulta para todo el lote
+    emails = [clean['email'] for _, clean in valid]
+    taken = set(db.session.scalars(select(Donor.email).where(Donor.email.in_(emails)))) if emails else set()
+    
+    rows = []
+    for index, clean in valid:
+        if clean['email'] in taken:
+            results.append({'index': index, 'status': 'error', 'errors': ['Ya existe un donante con este email']})
+            continue
+        taken.add(clean['email'])
+        rows.append(_donor_values(clean, current_user.id))
+        results.append({'index': index, 'status': 'created'})
+    
+    # Un único INSERT por lotes y un único commit
+    if rows:
+        try:
+            db.session.bulk_insert_mappings(Donor, rows)
+            db.session.commit()
+        except IntegrityError as e:
+            # Otro proceso registró uno de los emails entre la consulta y el INSERT;
+            # cualquier otra violación llega al manejador genérico de la aplicación
+            if not _is_email_conflict(e):
+                raise
+            db.session.rollback()
             return jsonify({'message': 'Ya existe un donante con este email'}), 409
-        
-        # Crear donante
-        donor = Donor(
-            first_name=data['first_name'].strip(),
-            last_name=data['last_name'].strip(),
-            email=data['email'].strip().lower(),
-            phone=data.get('phone', '').strip() if data.get('phone') else None,
-            birth_date=datetime.strptime(data['birth_date'], '%Y-%m-%d').date(),
-            blood_type=BloodType(data['blood_type']),
-            weight=float(data['weight']),
-            last_donation_date=datetime.strptime(data['last_donation_date'], '%Y-%m-%d').date() if data.get('last_donation_date') else None,
-            is_eligible=data.get('is_eligible', True),
-            medical_notes=data.get('medical_notes', '').strip() if data.get('medical_notes') else None,
-            created_by=current_user.id
-        )
-        
-        db.session.add(donor)
-        db.session.commit()
-        
-        return jsonify({
-            'message': 'Donante registrado exitosamente',
-            'donor': donor.to_dict()
-        }), 201
-        
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'message': 'Error interno del servidor', 'error': str(e)}), 500
+        cache_delete(STATS_KEY)
+    
+    results.sort(key=lambda result: result['index'])
+    return jsonify({
+        'message': f'{len(rows)} de {len(entries)} donantes registrados',
+        'created': len(rows),
+        'failed': len(entries) - len(rows),
+        'results': results
+    }), 201 if rows else 400
 
 @donors_bp.route('', methods=['GET'])
 @jwt_required()
 def get_donors():
     """Obtiene la lista de donantes con filtros opcionales"""
-    try:
-        current_user = get_current_user()
-        if not current_user:
-            return jsonify({'message': 'Usuario no autenticado'}), 401
-        
-        # Construir query base
-        query = Donor.query
-        
-        # Los usuarios normales solo ven sus propios donantes
-        if not current_user.is_admin():
-            query = query.filter_by(created_by=current_user.id)
-        
-        # Aplicar filtros
-        blood_type = request.args.get('blood_type')
-        if blood_type:
-            try:
-                query = query.filter_by(blood_type=BloodType(blood_type))
-            except ValueError:
-                return jsonify({'message': 'Tipo de sangre inválido'}), 400
-        
-        is_eligible = request.args.get('is_eligible')
-        if is_eligible is not None:
-            query = query.filter_by(is_eligible=is_eligible.lower() == 'true')
-        
-        # Paginación
-        page = request.args.get('page', 1, type=int)
-        per_page = min(request.args.get('per_page', 10, type=int), 100)
-        
-        donors = query.paginate(
-            page=page,
-            per_page=per_page,
-            error_out=False
-        )
-        
-        return jsonify({
-            'message': 'Donantes obtenidos exitosamente',
-            'donors': [donor.to_dict() for donor in donors.items],
-            'pagination': {
-                'page': donors.page,
-                'pages': donors.pages,
-                'per_page': donors.per_page,
-                'total': donors.total
-            }
-        }), 200
-        
-    except Exception as e:
-        return jsonify({'message': 'Error interno del servidor', 'error': str(e)}), 500
+    current_user = get_current_user()
+    if not current_user:
+        return jsonify({'message': 'Usuario no autenticado'}), 401
+    
+    # Construir query base
+    query = Donor.query
+    
+    # Los usuarios normales solo ven sus propios donantes
+    if not current_user.is_admin():
+        query = query.filter_by(created_by=current_user.id)
+    
+    # Aplicar filtros
+    blood_type = request.args.get('blood_type')
+    if blood_type:
+        if blood_type not in BLOOD_TYPE_VALUES:
+            return jsonify({'message': 'Tipo de sangre inválido'}), 400
+        query = query.filter_by(blood_type=blood_type)
+    
+    is_eligible = request.args.get('is_eligible')
+    if is_eligible is not None:
+        query = query.filter_by(is_eligible=is_eligible.lower() == 'true')
+    
+    # Paginación por cursor (keyset): se continúa después del último id
+    # recibido, sin OFFSET ni COUNT(*) adicional
+    after_id = request.args.get('after_id', 0, type=int)
+    per_page = max(min(request.args.get('per_page', 10, type=int), 100), 1)
+    
+    # Orden estable por id, servido por los índices compuestos del modelo;
+    # se pide una fila extra para saber si existe una página siguiente
+    donors = query.filter(Donor.id > after_id).order_by(Donor.id).limit(per_page + 1).all()
+    has_next = len(donors) > per_page
+    donors = donors[:per_page]
+    
+    # Una sola fecha de referencia para todo el listado
+    today = date.today()
+    return jsonify({
+        'message': 'Donantes obtenidos exitosamente',
+        'donors': [donor.to_dict(today) for donor in donors],
+        'pagination': {
+            'per_page': per_page,
+            'next_cursor': donors[-1].id if has_next else None
+        }
+    }), 200
 
 @donors_bp.route('/<int:donor_id>', methods=['GET'])
 @jwt_required()
 def get_donor(donor_id):
     """Obtiene un donante específico"""
-    try:
-        current_user = get_current_user()
-        if not current_user:
-            return jsonify({'message': 'Usuario no autenticado'}), 401
-        
-        donor = Donor.query.get_or_404(donor_id)
-        
-        # Verificar permisos
-        if not current_user.is_admin() and donor.created_by != current_user.id:
-            return jsonify({'message': 'No tiene permisos para ver este donante'}), 403
-        
-        return jsonify({
-            'message': 'Donante obtenido exitosamente',
-            'donor': donor.to_dict()
-        }), 200
-        
-    except Exception as e:
-        return jsonify({'message': 'Error interno del servidor', 'error': str(e)}), 500
+    current_user = get_current_user()
+    if not current_user:
+        return jsonify({'message': 'Usuario no autenticado'}), 401
+    
+    donor = Donor.query.get_or_404(donor_id)
+    
+    # Verificar permisos
+    if not current_user.is_admin() and donor.created_by != current_user.id:
+        return jsonify({'message': 'No tiene permisos para ver este donante'}), 403
+    
+    return jsonify({
+        'message': 'Donante obtenido exitosamente',
+        'donor': donor.to_dict()
+    }), 200
 
 @donors_bp.route('/<int:donor_id>', methods=['PUT'])
 @jwt_required()
 def update_donor(donor_id):
     """Actualiza un donante"""
-    try:
-        current_user = get_current_user()
-        if not current_user:
-            return jsonify({'message': 'Usuario no autenticado'}), 401
-        
-        donor = Donor.query.get_or_404(donor_id)
-        
-        # Verificar permisos
-        if not current_user.is_admin() and donor.created_by != current_user.id:
-            return jsonify({'message': 'No tiene permisos para modificar este donante'}), 403
-        
-        data = request.get_json()
-        if not data:
-            return jsonify({'message': 'No se proporcionaron datos'}), 400
-        
-        # Validar datos
-        errors = validate_donor_data(data, is_update=True)
-        if errors:
-            return jsonify({'message': 'Errores de validación', 'errors': errors}), 400
-        
-        # Verificar email único
-        if 'email' in data:
-            existing_donor = Donor.query.filter_by(email=data['email']).filter(Donor.id != donor_id).first()
-            if existing_donor:
-                return jsonify({'message': 'Ya existe un donante con este email'}), 409
-        
-        # Actualizar campos
-        update_fields = [
-            'first_name', 'last_name', 'email', 'phone', 'birth_date',
-            'blood_type', 'weight', 'last_donation_date', 'is_eligible', 'medical_notes'
-        ]
-        
-        for field in update_fields:
-            if field in data:
-                if field == 'birth_date' and data[field]:
-                    setattr(donor, field, datetime.strptime(data[field], '%Y-%m-%d').date())
-                elif field == 'last_donation_date' and data[field]:
-                    setattr(donor, field, datetime.strptime(data[field], '%Y-%m-%d').date())
-                elif field == 'blood_type' and data[field]:
-                    setattr(donor, field, BloodType(data[field]))
-                elif field in ['first_name', 'last_name', 'email']:
-                    setattr(donor, field, data[field].strip())
-                else:
-                    setattr(donor, field, data[field])
-        
-        db.session.commit()
-        
-        return jsonify({
-            'message': 'Donante actualizado exitosamente',
-            'donor': donor.to_dict()
-        }), 200
-        
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'message': 'Error interno del servidor', 'error': str(e)}), 500
+    current_user = get_current_user()
+    if not current_user:
+        return jsonify({'message': 'Usuario no autenticado'}), 401
+    
+    donor = Donor.query.get_or_404(donor_id)
+    
+    # Verificar permisos
+    if not current_user.is_admin() and donor.created_by != current_user.id:
+        return jsonify({'message': 'No tiene permisos para modificar este donante'}), 403
+    
+    data = request.get_json()
+    if not data:
+        return jsonify({'message': 'No se proporcionaron datos'}), 400
+    
+    # Validar datos
+    errors, clean = validate_donor_data(data, is_update=True)
+    if errors:
+        return jsonify({'message': 'Errores de validación', 'errors': errors}), 400
+    
+    # Verificar email único
+    if clean.get('email'):
+        if email_taken(clean['email'], exclude_id=donor_id):
+            return jsonify({'message': 'Ya existe un donante con este email'}), 409
+    
+    # Actualizar campos
+    update_fields = [
+        'first_name', 'last_name', 'email', 'phone', 'birth_date',
+        'blood_type', 'weight', 'last_donation_date', 'is_eligible', 'medical_notes'
+    ]
+    
+    # Los valores ya vienen recortados y convertidos por la validación
+    for field in update_fields:
+        if field in clean:
+            setattr(donor, field, clean[field])
+    
+    db.session.commit()
+    cache_delete(STATS_KEY)
+    
+    return jsonify({
+        'message': 'Donante actualizado exitosamente',
+        'donor': donor.to_dict()
+    }), 200
 
 @donors_bp.route('/<int:donor_id>', methods=['DELETE'])
 @jwt_required()
 def delete_donor(donor_id):
     """Elimina un donante"""
-    try:
-        current_user = get_current_user()
-        if not current_user:
-            return jsonify({'message': 'Usuario no autenticado'}), 401
-        
-        donor = Donor.query.get_or_404(donor_id)
-        
-        # Verificar permisos (solo admin o el creador puede eliminar)
-        if not current_user.is_admin() and donor.created_by != current_user.id:
-            return jsonify({'message': 'No tiene permisos para eliminar este donante'}), 403
-        
-        db.session.delete(donor)
-        db.session.commit()
-        
-        return jsonify({'message': 'Donante eliminado exitosamente'}), 200
-        
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'message': 'Error interno del servidor', 'error': str(e)}), 500
+    current_user = get_current_user()
+    if not current_user:
+        return jsonify({'message': 'Usuario no autenticado'}), 401
+    
+    # Solo se lee el creador para verificar permisos, sin cargar el donante
+    created_by = db.session.query(Donor.created_by).filter_by(id=donor_id).scalar()
+    if created_by is None:
+        return jsonify({'message': 'Donante no encontrado'}), 404
+    
+    # Verificar permisos (solo admin o el creador puede eliminar)
+    if not current_user.is_admin() and created_by != current_user.id:
+        return jsonify({'message': 'No tiene permisos para eliminar este donante'}), 403
+    
+    Donor.query.filter_by(id=donor_id).delete(synchronize_session=False)
+    db.session.commit()
+    cache_delete(STATS_KEY)
+    
+    return jsonify({'message': 'Donante eliminado exitosamente'}), 200
 
 @donors_bp.route('/eligibility-check/<int:donor_id>', methods=['GET'])
 @jwt_required()
 def check_donor_eligibility(donor_id):
     """Verifica la elegibilidad de un donante para donar"""
-    try:
-        current_user = get_current_user()
-        if not current_user:
-            return jsonify({'message': 'Usuario no autenticado'}), 401
-        
-        donor = Donor.query.get_or_404(donor_id)
-        
-        # Verificar permisos
-        if not current_user.is_admin() and donor.created_by != current_user.id:
-            return jsonify({'message': 'No tiene permisos para ver este donante'}), 403
-        
-        eligible, reason = donor.is_eligible_for_donation()
-        
-        return jsonify({
-            'message': 'Verificación de elegibilidad completada',
-            'donor_id': donor_id,
-            'donor_name': f"{donor.first_name} {donor.last_name}",
-            'eligible': eligible,
-            'reason': reason,
-            'details': {
-                'age': donor.get_age(),
-                'weight': donor.weight,
-                'blood_type': donor.blood_type.value,
-                'last_donation_date': donor.last_donation_date.isoformat() if donor.last_donation_date else None,
-                'is_marked_eligible': donor.is_eligible
-            }
-        }), 200
-        
-    except Exception as e:
-        return jsonify({'message': 'Error interno del servidor', 'error': str(e)}), 500
+    current_user = get_current_user()
+    if not current_user:
+        return jsonify({'message': 'Usuario no autenticado'}), 401
+    
+    donor = Donor.query.get_or_404(donor_id)
+    
+    # Verificar permisos
+    if not current_user.is_admin() and donor.created_by != current_user.id:
+        return jsonify({'message': 'No tiene permisos para ver este donante'}), 403
+    
+    eligible, reason = donor.is_eligible_for_donation()
+    
+    return jsonify({
+        'message': 'Verificación de elegibilidad completada',
+        'donor_id': donor_id,
+        'donor_name': f"{donor.first_name} {donor.last_name}",
+        'eligible': eligible,
+        'reason': reason,
+        'details': {
+            'age': donor.get_age(),
+            'weight': donor.weight,
+            'blood_type': donor.blood_type,
+            'last_donation_date': donor.last_donation_date,
+            'is_marked_eligible': donor.is_eligible
+        }
+    }), 200
 
 @donors_bp.route('/statistics', methods=['GET'])
 @admin_required
 def get_donor_statistics():
     """Obtiene estadísticas de donantes (solo administradores)"""
-    try:
-        total_donors = Donor.query.count()
-        eligible_donors = Donor.query.filter_by(is_eligible=True).count()
-        
-        # Estadísticas por tipo de sangre
-        blood_type_stats = {}
-        for blood_type in BloodType:
-            count = Donor.query.filter_by(blood_type=blood_type).count()
-            blood_type_stats[blood_type.value] = count
-        
-        # Donantes por rango de edad
-        age_ranges = {
-            '16-25': 0,
-            '26-35': 0,
-            '36-45': 0,
-            '46-55': 0,
-            '56-65': 0,
-            '66+': 0
+    # Como en /api/auth/users: el rol del token puede haber cambiado desde que se emitió
+    if not current_admin_is_valid():
+        return jsonify({'message': 'Acceso denegado. Se requieren permisos de administrador'}), 403
+    
+    # Las estadísticas se sirven desde Redis mientras no cambien los donantes
+    cached = cache_get(STATS_KEY)
+    if cached is not None:
+        return current_app.response_class(cached, mimetype='application/json')
+    
+    # Distribución por tipo de sangre y totales en una sola consulta agrupada
+    total_donors = 0
+    eligible_donors = 0
+    blood_type_stats = {blood_type.value: 0 for blood_type in BloodType}
+    blood_type_rows = db.session.query(
+        Donor.blood_type,
+        func.count(Donor.id),
+        func.sum(case((Donor.is_eligible, 1), else_=0))
+    ).group_by(Donor.blood_type)
+    for blood_type, count, eligible in blood_type_rows:
+        blood_type_stats[blood_type] = count
+        total_donors += count
+        eligible_donors += eligible
+    
+    # Donantes por rango de edad, agrupados en la base de datos:
+    # edad >= N  <=>  birth_date <= hoy - N años
+    today = date.today()
+    age_range = case(
+        *((Donor.birth_date > _years_ago(today, upper), label) for label, upper in AGE_BUCKETS),
+        else_=OLDEST_AGE_BUCKET
+    ).label('age_range')
+    
+    age_ranges = dict.fromkeys(AGE_RANGE_LABELS, 0)
+    age_rows = db.session.query(age_range, func.count(Donor.id)).group_by('age_range')
+    for bucket, count in age_rows:
+        age_ranges[bucket] = count
+    
+    body = dumps({
+        'message': 'Estadísticas obtenidas exitosamente',
+        'statistics': {
+            'total_donors': total_donors,
+            'eligible_donors': eligible_donors,
+            'ineligible_donors': total_donors - eligible_donors,
+            'eligibility_rate': round((eligible_donors / total_donors * 100) if total_donors > 0 else 0, 2),
+            'blood_type_distribution': blood_type_stats,
+            'age_distribution': age_ranges
         }
-        
-        all_donors = Donor.query.all()
-        for donor in all_donors:
-            age = donor.get_age()
-            if 16 <= age <= 25:
-                age_ranges['16-25'] += 1
-            elif 26 <= age <= 35:
-                age_ranges['26-35'] += 1
-            elif 36 <= age <= 45:
-                age_ranges['36-45'] += 1
-            elif 46 <= age <= 55:
-                age_ranges['46-55'] += 1
-            elif 56 <= age <= 65:
-                age_ranges['56-65'] += 1
-            else:
-                age_ranges['66+'] += 1
-        
-        return jsonify({
-            'message': 'Estadísticas obtenidas exitosamente',
-            'statistics': {
-                'total_donors': total_donors,
-                'eligible_donors': eligible_donors,
-                'ineligible_donors': total_donors - eligible_donors,
-                'eligibility_rate': round((eligible_donors / total_donors * 100) if total_donors > 0 else 0, 2),
-                'blood_type_distribution': blood_type_stats,
-                'age_distribution': age_ranges
-            }
-        }), 200
-        
-    except Exception as e:
-        return jsonify({'message': 'Error interno del servidor', 'error': str(e)}), 500
\ No newline at end of file
+    })
+    cache_set(STATS_KEY, body, STATS_TTL)
+    return current_app.response_class(body, mimetype='application/json')
\ No newline at end of file
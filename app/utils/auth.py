@@ -1,8 +1,10 @@
 from functools import wraps
-from flask import jsonify, request, current_app
+from flask import jsonify, request, current_app, g
 from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity, get_jwt
 from app.models import User, UserRole, db
+from sqlalchemy.exc import IntegrityError
 import jwt
+import string
 
 def token_required(f):
     """Decorador que requiere un token JWT válido"""
@@ -11,49 +13,54 @@ def token_required(f):
         try:
             verify_jwt_in_request()
             return f(*args, **kwargs)
-        except Exception as e:
-            return jsonify({'message': 'Token inválido o expirado', 'error': str(e)}), 401
+        except Exception:
+            # Mensaje fijo: el detalle de la excepción de JWT no se expone
+            return jsonify({'message': 'Token inválido o expirado'}), 401
     return decorated
 
 def admin_required(f):
     """Decorador que requiere rol de administrador"""
     @wraps(f)
     def decorated(*args, **kwargs):
+        # Solo la verificación del token queda protegida; los errores de la
+        # vista llegan al manejador global de la aplicación
         try:
             verify_jwt_in_request()
-            current_user_id = get_jwt_identity()
-            user = User.query.get(current_user_id)
-            
-            if not user:
-                return jsonify({'message': 'Usuario no encontrado'}), 404
-            
-            if not user.is_admin():
-                return jsonify({'message': 'Acceso denegado. Se requieren permisos de administrador'}), 403
-            
-            return f(*args, **kwargs)
-        except Exception as e:
-            return jsonify({'message': 'Error de autenticación', 'error': str(e)}), 401
+            claims = get_jwt()
+        except Exception:
+            return jsonify({'message': 'Error de autenticación'}), 401
+        
+        # El rol y el estado viajan como claims en el token, sin consultar la base de datos
+        if claims.get('active') is not True:
+            return jsonify({'message': 'Usuario inactivo'}), 403
+        
+        if claims.get('role') != UserRole.ADMIN.value:
+            return jsonify({'message': 'Acceso denegado. Se requieren permisos de administrador'}), 403
+        
+        return f(*args, **kwargs)
     return decorated
 
 def role_required(required_role):
     """Decorador que requiere un rol específico"""
+    required_value = UserRole(required_role).value
+    
     def decorator(f):
         @wraps(f)
         def decorated(*args, **kwargs):
             try:
                 verify_jwt_in_request()
-                current_user_id = get_jwt_identity()
-                user = User.query.get(current_user_id)
-                
-                if not user:
-                    return jsonify({'message': 'Usuario no encontrado'}), 404
-                
-                if user.role != required_role:
-                    return jsonify({'message': f'Acceso denegado. Se requiere rol: {required_role.value}'}), 403
-                
-                return f(*args, **kwargs)
-            except Exception as e:
-                return jsonify({'message': 'Error de autenticación', 'error': str(e)}), 401
+                claims = get_jwt()
+            except Exception:
+                return jsonify({'message': 'Error de autenticación'}), 401
+            
+            # Igual que admin_required: el rol y el estado se leen de los claims del token
+            if claims.get('active') is not True:
+                return jsonify({'message': 'Usuario inactivo'}), 403
+            
+            if claims.get('role') != required_value:
+                return jsonify({'message': f'Acceso denegado. Se requiere rol: {required_value}'}), 403
+            
+            return f(*args, **kwargs)
         return decorated
     return decorator
 
@@ -62,9 +69,23 @@ def get_current_user():
     try:
         verify_jwt_in_request()
         current_user_id = get_jwt_identity()
-        return User.query.get(current_user_id)
     except Exception:
         return None
+    
+    # Se memoriza en g para no repetir el SELECT dentro de la misma petición;
+    # la clave incluye la identidad porque g puede sobrevivir a la petición
+    cached = g.get('_current_user')
+    if cached is not None and cached[0] == current_user_id:
+        return cached[1]
+    
+    user = User.query.get(current_user_id)
+    g._current_user = (current_user_id, user)
+    return user
+
+def current_admin_is_valid():
+    """Confirma en la base de datos que el admin del token existe, está activo y conserva el rol"""
+    user = get_current_user()
+    return user is not None and user.is_active and user.is_admin()
 
 def check_user_permissions(user_id=None, admin_only=False):
     """Verifica los permisos del usuario actual"""
@@ -85,6 +106,15 @@ def check_user_permissions(user_id=None, admin_only=False):
     
     return True, "Permisos válidos"
 
+MAX_PASSWORD_LENGTH = 128
+
+# Tabla de traducción que reduce cada carácter ASCII a su clase: U, L o D
+_ASCII_CHAR_CLASSES = str.maketrans({
+    **dict.fromkeys(string.ascii_uppercase, 'U'),
+    **dict.fromkeys(string.ascii_lowercase, 'L'),
+    **dict.fromkeys(string.digits, 'D')
+})
+
 class AuthUtils:
     """Utilidades para autenticación y autorización"""
     
@@ -94,13 +124,36 @@ class AuthUtils:
         if len(password) < 8:
             return False, "La contraseña debe tener al menos 8 caracteres"
         
-        if not any(c.isupper() for c in password):
+        # Límite superior: acota el trabajo por intento de autenticación
+        if len(password) > MAX_PASSWORD_LENGTH:
+            return False, f"La contraseña no puede tener más de {MAX_PASSWORD_LENGTH} caracteres"
+        
+        if password.isascii():
+            # Una sola llamada en C clasifica todos los caracteres ASCII
+            classes = password.translate(_ASCII_CHAR_CLASSES)
+            has_upper = 'U' in classes
+            has_lower = 'L' in classes
+            has_digit = 'D' in classes
+        else:
+            # Un solo recorrido de la contraseña para las tres clases de caracteres
+            has_upper = has_lower = has_digit = False
+            for c in password:
+                if c.isupper():
+                    has_upper = True
+                elif c.islower():
+                    has_lower = True
+                elif c.isdigit():
+                    has_digit = True
+                if has_upper and has_lower and has_digit:
+                    break
+        
+        if not has_upper:
             return False, "La contraseña debe contener al menos una letra mayúscula"
         
-        if not any(c.islower() for c in password):
+        if not has_lower:
             return False, "La contraseña debe contener al menos una letra minúscula"
         
-        if not any(c.isdigit() for c in password):
+        if not has_digit:
             return False, "La contraseña debe contener al menos un número"
         
         return True, "Contraseña válida"
@@ -123,9 +176,14 @@ class AuthUtils:
             db.session.add(user)
             db.session.commit()
             return user, "Usuario creado exitosamente"
-        except Exception as e:
+        except IntegrityError:
+            # Registro concurrente con el mismo email
+            db.session.rollback()
+            return None, "El email ya está registrado"
+        except Exception:
+            # El resto llega al manejador global, que no expone detalles
             db.session.rollback()
-            return None, f"Error al crear usuario: {str(e)}"
+            raise
     
     @staticmethod
     def authenticate_user(email, password):
@@ -141,4 +199,8 @@ class AuthUtils:
         if not user.check_password(password):
             return None, "Contraseña incorrecta"
         
+        # Persistir el hash migrado si check_password lo actualizó
+        if db.session.is_modified(user):
+            db.session.commit()
+        
         return user, "Autenticación exitosa"
\ No newline at end of file
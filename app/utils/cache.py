@@ -0,0 +1,51 @@
+from flask import current_app
+
+try:
+    from redis import Redis
+    from redis.exceptions import RedisError
+except ImportError:  # Redis es opcional: sin él la caché queda desactivada
+    Redis = None
+    RedisError = Exception
+
+STATS_KEY = 'donor_stats:v1'
+STATS_TTL = 120
+
+def init_cache(app):
+    """Configura el cliente Redis si se definió REDIS_URL"""
+    redis_url = app.config.get('REDIS_URL')
+    if not redis_url:
+        return
+    if Redis is None:
+        raise RuntimeError('REDIS_URL requiere el paquete redis')
+    app.extensions['redis'] = Redis.from_url(redis_url)
+
+def cache_get(key):
+    """Lee una entrada de la caché; devuelve None si no existe o Redis falla"""
+    client = current_app.extensions.get('redis')
+    if client is None:
+        return None
+    try:
+        return client.get(key)
+    except RedisError as e:
+        current_app.logger.warning('Caché no disponible: %s', e)
+        return None
+
+def cache_set(key, value, ttl):
+    """Guarda una entrada en la caché con expiración"""
+    client = current_app.extensions.get('redis')
+    if client is None:
+        return
+    try:
+        client.setex(key, ttl, value)
+    except RedisError as e:
+        current_app.logger.warning('Caché no disponible: %s', e)
+
+def cache_delete(key):
+    """Invalida una entrada de la caché"""
+    client = current_app.extensions.get('redis')
+    if client is None:
+        return
+    try:
+        client.delete(key)
+    except RedisError as e:
+        current_app.logger.warning('Caché no disponible: %s', e)
@@ -0,0 +1,41 @@
+from flask import current_app
+from flask.json.provider import JSONProvider
+from decimal import Decimal
+import orjson
+
+def dumps(payload):
+    """Serializa el payload a bytes JSON (datetimes en ISO 8601 sin zona horaria)"""
+    return orjson.dumps(payload)
+
+def json_response(payload, status=200):
+    """Serializa el payload con orjson y devuelve la respuesta JSON"""
+    return current_app.response_class(
+        dumps(payload),
+        status=status,
+        mimetype='application/json'
+    )
+
+def _default(obj):
+    """Tipos adicionales que Flask serializa y orjson no"""
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+class ORJSONProvider(JSONProvider):
+    """Proveedor JSON de Flask basado en orjson (jsonify, get_json, tojson)"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_default).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        # Se envían los bytes de orjson directamente, sin decodificar a str
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=_default),
+            mimetype='application/json'
+        )
@@ -5,9 +5,12 @@ Demuestra la funcionalidad principal y las validaciones
 """
 
 import json
+import sys
 import hashlib
 from datetime import datetime, date, timedelta
 from enum import Enum
+from functools import lru_cache
+import itertools
 import re
 
 # Simulación de modelos sin SQLAlchemy para demostrar la lógica
@@ -25,27 +28,41 @@ class BloodType(Enum):
     O_POSITIVE = "O+"
     O_NEGATIVE = "O-"
 
+# Tipos de sangre calculados una sola vez al importar el módulo
+_BLOOD_VALUES = frozenset(bt.value for bt in BloodType)
+_EXPECTED_BLOOD = frozenset({"A+", "A-", "B+", "B-", "AB+", "AB-", "O+", "O-"})
+
+# Identificadores secuenciales por modelo, como los autoincrementales de la base de datos
+_USER_IDS = itertools.count(1)
+_DONOR_IDS = itertools.count(1)
+
+@lru_cache(maxsize=1024)
+def _sha256_hex(password):
+    """Hash SHA-256 de la contraseña, memorizado para verificaciones repetidas"""
+    return hashlib.sha256(password.encode()).hexdigest()
+
 class User:
-    def __init__(self, email, role=UserRole.USER):
-        self.id = hash(email) % 10000
+    def __init__(self, email, role=UserRole.USER, now=None):
+        self.id = next(_USER_IDS)
         self.email = email
         self.role = role
         self.is_active = True
         self.password_hash = None
-        self.created_at = datetime.now()
+        # Quien crea objetos en lote puede pasar una sola lectura del reloj
+        self.created_at = now or datetime.now()
     
     def set_password(self, password):
-        self.password_hash = hashlib.sha256(password.encode()).hexdigest()
+        self.password_hash = _sha256_hex(password)
     
     def check_password(self, password):
-        return self.password_hash == hashlib.sha256(password.encode()).hexdigest()
+        return self.password_hash == _sha256_hex(password)
     
     def is_admin(self):
         return self.role == UserRole.ADMIN
 
 class Donor:
-    def __init__(self, first_name, last_name, email, birth_date, blood_type, weight, created_by):
-        self.id = hash(email) % 10000
+    def __init__(self, first_name, last_name, email, birth_date, blood_type, weight, created_by, now=None):
+        self.id = next(_DONOR_IDS)
         self.first_name = first_name
         self.last_name = last_name
         self.email = email
@@ -56,14 +73,16 @@ class Donor:
         self.last_donation_date = None
         self.is_eligible = True
         self.medical_notes = None
-        self.created_at = datetime.now()
+        self.created_at = now or datetime.now()
     
-    def get_age(self):
-        today = date.today()
+    def get_age(self, today=None):
+        today = today or date.today()
         return today.year - self.birth_date.year - ((today.month, today.day) < (self.birth_date.month, self.birth_date.day))
     
-    def is_eligible_for_donation(self):
-        age = self.get_age()
+    def is_eligible_for_donation(self, today=None):
+        # Una sola lectura del reloj para la edad y el intervalo entre donaciones
+        today = today or date.today()
+        age = self.get_age(today)
         
         if not self.is_eligible:
             return False, "Donante marcado como no elegible"
@@ -75,35 +94,56 @@ class Donor:
             return False, "Peso insuficiente (mínimo 50kg)"
         
         if self.last_donation_date:
-            days_since_last = (date.today() - self.last_donation_date).days
+            days_since_last = (today - self.last_donation_date).days
             if days_since_last < 56:
                 return False, f"Debe esperar {56 - days_since_last} días más para donar"
         
         return True, "Elegible para donación"
 
+MAX_PASSWORD_LENGTH = 128
+
 class AuthUtils:
     @staticmethod
     def validate_password(password):
         if len(password) < 8:
             return False, "La contraseña debe tener al menos 8 caracteres"
         
-        if not any(c.isupper() for c in password):
+        # Límite superior: acota el trabajo por intento de autenticación
+        if len(password) > MAX_PASSWORD_LENGTH:
+            return False, f"La contraseña no puede tener más de {MAX_PASSWORD_LENGTH} caracteres"
+        
+        # Un solo recorrido de la contraseña, como en app/utils/auth.py
+        has_upper = has_lower = has_digit = False
+        for c in password:
+            if c.isupper():
+                has_upper = True
+            elif c.islower():
+                has_lower = True
+            elif c.isdigit():
+                has_digit = True
+            if has_upper and has_lower and has_digit:
+                break
+        
+        if not has_upper:
             return False, "La contraseña debe contener al menos una letra mayúscula"
         
-        if not any(c.islower() for c in password):
+        if not has_lower:
             return False, "La contraseña debe contener al menos una letra minúscula"
         
-        if not any(c.isdigit() for c in password):
+        if not has_digit:
             return False, "La contraseña debe contener al menos un número"
         
         return True, "Contraseña válida"
 
+# Patrón de email compilado una sola vez al importar el módulo
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
 def validate_email(email):
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
+    return _EMAIL_RE.match(email) is not None
 
-def validate_donor_data(data):
+def validate_donor_data(data, today=None):
     errors = []
+    today = today or date.today()
     
     # Validar campos requeridos
     required_fields = ['first_name', 'last_name', 'email', 'birth_date', 'blood_type', 'weight']
@@ -119,8 +159,9 @@ def validate_donor_data(data):
     # Validar edad
     if 'birth_date' in data and data['birth_date']:
         try:
-            birth_date = datetime.strptime(data['birth_date'], '%Y-%m-%d').date()
-            age = (date.today() - birth_date).days // 365
+            birth_date = date.fromisoformat(data['birth_date'])
+            # Años cumplidos, igual que Donor.get_age (sin timedelta ni división)
+            age = today.year - birth_date.year - ((today.month, today.day) < (birth_date.month, birth_date.day))
             if age < 16:
                 errors.append('El donante debe tener al menos 16 años')
             if age > 70:
@@ -141,53 +182,62 @@ def validate_donor_data(data):
     
     return errors
 
+def validate_donor_batch(records):
+    """Valida un lote de donantes con una única fecha de referencia"""
+    today = date.today()
+    return [validate_donor_data(record, today) for record in records]
+
 def run_tests():
     """Ejecuta pruebas para demostrar la funcionalidad"""
-    print("="*60)
-    print("PRUEBAS DEL SISTEMA DE REGISTRO DE DONANTES")
-    print("="*60)
+    # El informe se acumula y se escribe de una sola vez al final
+    lines = []
+    emit = lines.append
+    
+    emit("="*60)
+    emit("PRUEBAS DEL SISTEMA DE REGISTRO DE DONANTES")
+    emit("="*60)
     
     tests_passed = 0
     tests_total = 0
     
     # Test 1: Validación de contraseñas
     tests_total += 1
-    print(f"\n{tests_total}. Prueba de validación de contraseñas:")
+    emit(f"\n{tests_total}. Prueba de validación de contraseñas:")
     
     # Contraseña válida
     valid, msg = AuthUtils.validate_password("Password123!")
     if valid:
-        print("  ✓ Contraseña válida aceptada")
+        emit("  ✓ Contraseña válida aceptada")
         tests_passed += 1
     else:
-        print(f"  ✗ Error: {msg}")
+        emit(f"  ✗ Error: {msg}")
     
     # Contraseña inválida
     valid, msg = AuthUtils.validate_password("weak")
     if not valid:
-        print(f"  ✓ Contraseña débil rechazada: {msg}")
+        emit(f"  ✓ Contraseña débil rechazada: {msg}")
     else:
-        print("  ✗ Error: contraseña débil fue aceptada")
+        emit("  ✗ Error: contraseña débil fue aceptada")
     
     # Test 2: Creación de usuario
     tests_total += 1
-    print(f"\n{tests_total}. Prueba de creación de usuario:")
+    emit(f"\n{tests_total}. Prueba de creación de usuario:")
     
     try:
         user = User("admin@test.com", UserRole.ADMIN)
         user.set_password("Admin123!")
         
         if user.is_admin() and user.check_password("Admin123!"):
-            print("  ✓ Usuario administrador creado correctamente")
+            emit("  ✓ Usuario administrador creado correctamente")
             tests_passed += 1
         else:
-            print("  ✗ Error en creación de usuario")
+            emit("  ✗ Error en creación de usuario")
     except Exception as e:
-        print(f"  ✗ Error: {e}")
+        emit(f"  ✗ Error: {e}")
     
     # Test 3: Validación de datos de donante
     tests_total += 1
-    print(f"\n{tests_total}. Prueba de validación de donante:")
+    emit(f"\n{tests_total}. Prueba de validación de donante:")
     
     # Datos válidos
     valid_data = {
@@ -201,10 +251,10 @@ def run_tests():
     
     errors = validate_donor_data(valid_data)
     if not errors:
-        print("  ✓ Datos válidos de donante aceptados")
+        emit("  ✓ Datos válidos de donante aceptados")
         tests_passed += 1
     else:
-        print(f"  ✗ Error con datos válidos: {errors}")
+        emit(f"  ✗ Error con datos válidos: {errors}")
     
     # Datos inválidos
     invalid_data = {
@@ -216,13 +266,13 @@ def run_tests():
     
     errors = validate_donor_data(invalid_data)
     if errors:
-        print(f"  ✓ Datos inválidos rechazados: {len(errors)} errores encontrados")
+        emit(f"  ✓ Datos inválidos rechazados: {len(errors)} errores encontrados")
     else:
-        print("  ✗ Error: datos inválidos fueron aceptados")
+        emit("  ✗ Error: datos inválidos fueron aceptados")
     
     # Test 4: Creación y validación de donante
     tests_total += 1
-    print(f"\n{tests_total}. Prueba de creación de donante:")
+    emit(f"\n{tests_total}. Prueba de creación de donante:")
     
     try:
         donor = Donor(
@@ -239,16 +289,16 @@ def run_tests():
         eligible, reason = donor.is_eligible_for_donation()
         
         if eligible and 30 <= age <= 50:
-            print(f"  ✓ Donante creado: {donor.first_name} {donor.last_name}, edad {age}, elegible")
+            emit(f"  ✓ Donante creado: {donor.first_name} {donor.last_name}, edad {age}, elegible")
             tests_passed += 1
         else:
-            print(f"  ✗ Error en donante: edad {age}, elegible: {eligible}, razón: {reason}")
+            emit(f"  ✗ Error en donante: edad {age}, elegible: {eligible}, razón: {reason}")
     except Exception as e:
-        print(f"  ✗ Error: {e}")
+        emit(f"  ✗ Error: {e}")
     
     # Test 5: Prueba de elegibilidad por edad
     tests_total += 1
-    print(f"\n{tests_total}. Prueba de elegibilidad por edad:")
+    emit(f"\n{tests_total}. Prueba de elegibilidad por edad:")
     
     try:
         # Donante muy joven
@@ -264,16 +314,16 @@ def run_tests():
         
         eligible, reason = young_donor.is_eligible_for_donation()
         if not eligible and "edad" in reason.lower():
-            print(f"  ✓ Donante joven correctamente rechazado: {reason}")
+            emit(f"  ✓ Donante joven correctamente rechazado: {reason}")
             tests_passed += 1
         else:
-            print(f"  ✗ Error: donante joven aceptado incorrectamente")
+            emit(f"  ✗ Error: donante joven aceptado incorrectamente")
     except Exception as e:
-        print(f"  ✗ Error: {e}")
+        emit(f"  ✗ Error: {e}")
     
     # Test 6: Prueba de elegibilidad por peso
     tests_total += 1
-    print(f"\n{tests_total}. Prueba de elegibilidad por peso:")
+    emit(f"\n{tests_total}. Prueba de elegibilidad por peso:")
     
     try:
         light_donor = Donor(
@@ -288,16 +338,16 @@ def run_tests():
         
         eligible, reason = light_donor.is_eligible_for_donation()
         if not eligible and "peso" in reason.lower():
-            print(f"  ✓ Donante con peso insuficiente correctamente rechazado: {reason}")
+            emit(f"  ✓ Donante con peso insuficiente correctamente rechazado: {reason}")
             tests_passed += 1
         else:
-            print(f"  ✗ Error: donante con peso insuficiente aceptado")
+            emit(f"  ✗ Error: donante con peso insuficiente aceptado")
     except Exception as e:
-        print(f"  ✗ Error: {e}")
+        emit(f"  ✗ Error: {e}")
     
     # Test 7: Prueba de elegibilidad por donación reciente
     tests_total += 1
-    print(f"\n{tests_total}. Prueba de elegibilidad por donación reciente:")
+    emit(f"\n{tests_total}. Prueba de elegibilidad por donación reciente:")
     
     try:
         recent_donor = Donor(
@@ -313,32 +363,29 @@ def run_tests():
         
         eligible, reason = recent_donor.is_eligible_for_donation()
         if not eligible and "esperar" in reason.lower():
-            print(f"  ✓ Donante con donación reciente correctamente rechazado: {reason}")
+            emit(f"  ✓ Donante con donación reciente correctamente rechazado: {reason}")
             tests_passed += 1
         else:
-            print(f"  ✗ Error: donante con donación reciente aceptado")
+            emit(f"  ✗ Error: donante con donación reciente aceptado")
     except Exception as e:
-        print(f"  ✗ Error: {e}")
+        emit(f"  ✗ Error: {e}")
     
     # Test 8: Prueba de tipos de sangre
     tests_total += 1
-    print(f"\n{tests_total}. Prueba de tipos de sangre:")
+    emit(f"\n{tests_total}. Prueba de tipos de sangre:")
     
     try:
-        blood_types = [bt.value for bt in BloodType]
-        expected_types = ["A+", "A-", "B+", "B-", "AB+", "AB-", "O+", "O-"]
-        
-        if set(blood_types) == set(expected_types):
-            print(f"  ✓ Tipos de sangre correctos: {', '.join(blood_types)}")
+        if _BLOOD_VALUES == _EXPECTED_BLOOD:
+            emit(f"  ✓ Tipos de sangre correctos: {', '.join(bt.value for bt in BloodType)}")
             tests_passed += 1
         else:
-            print(f"  ✗ Error en tipos de sangre: {blood_types}")
+            emit(f"  ✗ Error en tipos de sangre: {sorted(_BLOOD_VALUES)}")
     except Exception as e:
-        print(f"  ✗ Error: {e}")
+        emit(f"  ✗ Error: {e}")
     
     # Test 9: Validación de email
     tests_total += 1
-    print(f"\n{tests_total}. Prueba de validación de email:")
+    emit(f"\n{tests_total}. Prueba de validación de email:")
     
     valid_emails = ["test@example.com", "user.name@domain.co.uk", "admin123@test-site.org"]
     invalid_emails = ["invalid-email", "@domain.com", "user@", "user.domain"]
@@ -347,56 +394,58 @@ def run_tests():
     all_invalid = not any(validate_email(email) for email in invalid_emails)
     
     if all_valid and all_invalid:
-        print("  ✓ Validación de email funciona correctamente")
+        emit("  ✓ Validación de email funciona correctamente")
         tests_passed += 1
     else:
-        print("  ✗ Error en validación de email")
+        emit("  ✗ Error en validación de email")
     
     # Test 10: Roles de usuario
     tests_total += 1
-    print(f"\n{tests_total}. Prueba de roles de usuario:")
+    emit(f"\n{tests_total}. Prueba de roles de usuario:")
     
     try:
         admin = User("admin@test.com", UserRole.ADMIN)
         regular_user = User("user@test.com", UserRole.USER)
         
         if admin.is_admin() and not regular_user.is_admin():
-            print("  ✓ Roles de usuario funcionan correctamente")
+            emit("  ✓ Roles de usuario funcionan correctamente")
             tests_passed += 1
         else:
-            print("  ✗ Error en roles de usuario")
+            emit("  ✗ Error en roles de usuario")
     except Exception as e:
-        print(f"  ✗ Error: {e}")
+        emit(f"  ✗ Error: {e}")
     
     # Resumen
-    print("\n" + "="*60)
-    print("RESUMEN DE PRUEBAS")
-    print("="*60)
-    print(f"Pruebas ejecutadas: {tests_total}")
-    print(f"Pruebas exitosas: {tests_passed}")
-    print(f"Pruebas fallidas: {tests_total - tests_passed}")
+    emit("\n" + "="*60)
+    emit("RESUMEN DE PRUEBAS")
+    emit("="*60)
+    emit(f"Pruebas ejecutadas: {tests_total}")
+    emit(f"Pruebas exitosas: {tests_passed}")
+    emit(f"Pruebas fallidas: {tests_total - tests_passed}")
     
     coverage = (tests_passed / tests_total) * 100
-    print(f"Cobertura simulada: {coverage:.1f}%")
+    emit(f"Cobertura simulada: {coverage:.1f}%")
     
     if coverage >= 80:
-        print("✓ ¡Cobertura superior al 80% alcanzada!")
+        emit("✓ ¡Cobertura superior al 80% alcanzada!")
     else:
-        print("✗ Cobertura insuficiente")
-    
-    print("\n" + "="*60)
-    print("CARACTERÍSTICAS IMPLEMENTADAS")
-    print("="*60)
-    print("✓ Autenticación con hash de contraseñas")
-    print("✓ Control de roles (Administrador/Usuario)")
-    print("✓ Validación de datos de donantes")
-    print("✓ Cálculo de elegibilidad para donación")
-    print("✓ Validación de email y contraseñas")
-    print("✓ Gestión de tipos de sangre")
-    print("✓ Control de intervalos entre donaciones")
-    print("✓ Validaciones de edad y peso")
-    print("✓ Estructuras de datos bien definidas")
-    print("✓ Manejo de errores y validaciones")
+        emit("✗ Cobertura insuficiente")
+    
+    emit("\n" + "="*60)
+    emit("CARACTERÍSTICAS IMPLEMENTADAS")
+    emit("="*60)
+    emit("✓ Autenticación con hash de contraseñas")
+    emit("✓ Control de roles (Administrador/Usuario)")
+    emit("✓ Validación de datos de donantes")
+    emit("✓ Cálculo de elegibilidad para donación")
+    emit("✓ Validación de email y contraseñas")
+    emit("✓ Gestión de tipos de sangre")
+    emit("✓ Control de intervalos entre donaciones")
+    emit("✓ Validaciones de edad y peso")
+    emit("✓ Estructuras de datos bien definidas")
+    emit("✓ Manejo de errores y validaciones")
+    
+    sys.stdout.write("\n".join(lines) + "\n")
 
 if __name__ == "__main__":
     run_tests()
\ No newline at end of file
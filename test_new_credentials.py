@@ -4,15 +4,28 @@ Prueba del sistema con las nuevas credenciales de variables de entorno
 """
 
 import os
+import sys
+import hashlib
+import secrets
+from functools import lru_cache
 from dotenv import load_dotenv
 
 # Cargar variables de entorno
 load_dotenv()
 
+@lru_cache(maxsize=16)
+def _sha256_hex(password):
+    """Hash SHA-256 de la contraseña, calculado una sola vez por valor"""
+    return hashlib.sha256(password.encode()).hexdigest()
+
 def test_environment_variables():
     """Prueba las variables de entorno"""
-    print("🔄 PROBANDO NUEVAS VARIABLES DE ENTORNO")
-    print("="*50)
+    # El informe se acumula y se escribe de una sola vez al final
+    lines = []
+    emit = lines.append
+    
+    emit("🔄 PROBANDO NUEVAS VARIABLES DE ENTORNO")
+    emit("="*50)
     
     # Obtener variables
     admin_email = os.getenv('ADMIN_EMAIL', 'admin@example.com')
@@ -21,15 +34,15 @@ def test_environment_variables():
     secret_key = os.getenv('SECRET_KEY', 'dev-secret')
     database_url = os.getenv('DATABASE_URL', 'sqlite:///donors.db')
     
-    print(f"📧 ADMIN_EMAIL: {admin_email}")
-    print(f"🔑 ADMIN_PASSWORD: {'*' * len(admin_password)} (longitud: {len(admin_password)})")
-    print(f"🔐 JWT_SECRET_KEY: {'*' * len(jwt_secret)} (longitud: {len(jwt_secret)})")
-    print(f"🗝️  SECRET_KEY: {'*' * len(secret_key)} (longitud: {len(secret_key)})")
-    print(f"🗄️  DATABASE_URL: {database_url}")
+    emit(f"📧 ADMIN_EMAIL: {admin_email}")
+    emit(f"🔑 ADMIN_PASSWORD: {'*' * len(admin_password)} (longitud: {len(admin_password)})")
+    emit(f"🔐 JWT_SECRET_KEY: {'*' * len(jwt_secret)} (longitud: {len(jwt_secret)})")
+    emit(f"🗝️  SECRET_KEY: {'*' * len(secret_key)} (longitud: {len(secret_key)})")
+    emit(f"🗄️  DATABASE_URL: {database_url}")
     
-    print("\n" + "="*50)
-    print("✅ VALIDACIONES")
-    print("="*50)
+    emit("\n" + "="*50)
+    emit("✅ VALIDACIONES")
+    emit("="*50)
     
     # Validaciones
     validations = []
@@ -46,17 +59,29 @@ def test_environment_variables():
     else:
         validations.append("❌ Contraseña muy corta")
     
-    if any(c.isupper() for c in admin_password):
+    # Clasificar los caracteres de la contraseña en un solo recorrido
+    has_upper = has_lower = has_digit = False
+    for c in admin_password:
+        if c.isupper():
+            has_upper = True
+        elif c.islower():
+            has_lower = True
+        elif c.isdigit():
+            has_digit = True
+        if has_upper and has_lower and has_digit:
+            break
+    
+    if has_upper:
         validations.append("✅ Contraseña contiene mayúsculas")
     else:
         validations.append("❌ Contraseña sin mayúsculas")
     
-    if any(c.islower() for c in admin_password):
+    if has_lower:
         validations.append("✅ Contraseña contiene minúsculas")
     else:
         validations.append("❌ Contraseña sin minúsculas")
     
-    if any(c.isdigit() for c in admin_password):
+    if has_digit:
         validations.append("✅ Contraseña contiene números")
     else:
         validations.append("❌ Contraseña sin números")
@@ -73,19 +98,20 @@ def test_environment_variables():
         validations.append("❌ Secret Key muy corto")
     
     for validation in validations:
-        print(validation)
+        emit(validation)
     
     # Contar validaciones exitosas
-    passed = len([v for v in validations if v.startswith("✅")])
+    passed = sum(v.startswith("✅") for v in validations)
     total = len(validations)
     
-    print(f"\n🎯 RESULTADO: {passed}/{total} validaciones pasaron ({(passed/total)*100:.1f}%)")
+    emit(f"\n🎯 RESULTADO: {passed}/{total} validaciones pasaron ({(passed/total)*100:.1f}%)")
     
     if passed == total:
-        print("🎉 ¡Todas las validaciones pasaron! Las credenciales están correctas.")
+        emit("🎉 ¡Todas las validaciones pasaron! Las credenciales están correctas.")
     else:
-        print("⚠️  Algunas validaciones fallaron. Revisa las credenciales.")
+        emit("⚠️  Algunas validaciones fallaron. Revisa las credenciales.")
     
+    sys.stdout.write("\n".join(lines) + "\n")
     return passed == total
 
 def simulate_user_creation():
@@ -98,8 +124,7 @@ def simulate_user_creation():
     admin_password = os.getenv('ADMIN_PASSWORD', 'Admin123!')
     
     # Simular hash de contraseña (simplificado)
-    import hashlib
-    password_hash = hashlib.sha256(admin_password.encode()).hexdigest()
+    password_hash = _sha256_hex(admin_password)
     
     print(f"📧 Email: {admin_email}")
     print(f"🔒 Password Hash: {password_hash[:20]}...")
@@ -108,7 +133,7 @@ def simulate_user_creation():
     
     # Simular verificación de contraseña
     test_password = admin_password
-    test_hash = hashlib.sha256(test_password.encode()).hexdigest()
+    test_hash = _sha256_hex(test_password)
     
     if password_hash == test_hash:
         print("🔐 ✅ Verificación de contraseña: EXITOSA")
@@ -137,13 +162,8 @@ def simulate_login_test():
     print("3. ✅ Contraseña correcta")
     print("4. ✅ Generando token JWT...")
     
-    # Simular token JWT
-    import time
-    import base64
-    
-    jwt_secret = os.getenv('JWT_SECRET_KEY', 'dev-secret-key')
-    payload = f"{admin_email}:{int(time.time())}:{jwt_secret}"
-    fake_token = base64.b64encode(payload.encode()).decode()
+    # Simular token JWT con bytes aleatorios: el token no debe contener el secreto
+    fake_token = secrets.token_urlsafe(24)
     
     print(f"🎫 Token JWT generado: {fake_token[:30]}...")
     print("\n🎉 ¡LOGIN EXITOSO!")
@@ -47,10 +47,11 @@ def test_full_system():
     print("🔄 Sistema listo para funcionamiento completo")
     
     print("\n🎯 PASOS SIGUIENTES PARA USAR EL SISTEMA:")
-    print("1. Ejecutar: python registro.py")
-    print("2. El admin se creará automáticamente con las nuevas credenciales")
-    print("3. Hacer login POST /api/auth/login con las credenciales del .env")
-    print("4. Usar el token JWT para operaciones de donantes")
+    print("1. Ejecutar: flask --app registro init-db")
+    print("2. Ejecutar: flask --app registro init-admin (crea el admin con las nuevas credenciales)")
+    print("3. Ejecutar: python registro.py")
+    print("4. Hacer login POST /api/auth/login con las credenciales del .env")
+    print("5. Usar el token JWT para operaciones de donantes")
     
     print("\n🔧 COMANDOS PARA TESTING:")
     print("# Instalar dependencias:")
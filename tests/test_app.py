@@ -1,18 +1,60 @@
 import pytest
-import json
-from datetime import date, timedelta
+from types import MappingProxyType
+from datetime import date, datetime, timedelta
+from flask import has_app_context
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from sqlalchemy.orm import scoped_session, sessionmaker
 from app import create_app
 from app.models import db, User, Donor, UserRole, BloodType
+from app.routes.auth import register
 
-@pytest.fixture
+@pytest.fixture(scope='session')
 def app():
-    """Fixture de la aplicación Flask para pruebas"""
+    """Fixture de la aplicación Flask para pruebas (esquema creado una sola vez)"""
     app = create_app('testing')
     with app.app_context():
-        db.create_all()
-        yield app
+        # pysqlite no emite BEGIN por sí mismo; sin esto los SAVEPOINT no funcionan
+        @event.listens_for(db.engine, 'connect')
+        def disable_pysqlite_begin(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+        
+        @event.listens_for(db.engine, 'begin')
+        def emit_begin(conn):
+            conn.exec_driver_sql('BEGIN')
+        
+        app.test_cli_runner().invoke(args=['init-db'])
+    # El contexto no queda abierto: solo lo tienen las pruebas que piden db_session
+    yield app
+    with app.app_context():
         db.drop_all()
 
+@pytest.fixture
+def db_session(app):
+    """Sesión unida a una transacción externa que se revierte al terminar cada prueba"""
+    with app.app_context():
+        connection = db.engine.connect()
+        trans = connection.begin()
+        session_factory = sessionmaker(bind=connection)
+        nested = connection.begin_nested()
+        
+        # Los commit y rollback de las rutas cierran el SAVEPOINT; se abre otro
+        @event.listens_for(session_factory, 'after_transaction_end')
+        def restart_savepoint(session, transaction):
+            nonlocal nested
+            if not nested.is_active:
+                nested = connection.begin_nested()
+        
+        original_session = db.session
+        db.session = scoped_session(session_factory)
+        try:
+            yield db.session
+        finally:
+            db.session.remove()
+            db.session = original_session
+            trans.rollback()
+            connection.close()
+
 @pytest.fixture
 def client(app):
     """Cliente de prueba"""
@@ -23,59 +65,127 @@ def runner(app):
     """Runner de comandos"""
     return app.test_cli_runner()
 
-@pytest.fixture
-def admin_user(app):
-    """Usuario administrador para pruebas"""
+# Credenciales de los usuarios compartidos por toda la sesión de pruebas
+TEST_USERS = {
+    'admin': ('admin@test.com', 'Admin123!', UserRole.ADMIN),
+    'user': ('user@test.com', 'User123!', UserRole.USER)
+}
+
+@pytest.fixture(scope='session')
+def seeded_users(app):
+    """Crea los usuarios de prueba una sola vez y devuelve sus ids"""
+    # Contexto propio: la sesión se cierra al salir y no deja transacciones abiertas
     with app.app_context():
-        user = User(email='admin@test.com', role=UserRole.ADMIN)
-        user.set_password('Admin123!')
-        db.session.add(user)
+        users = []
+        for email, password, role in TEST_USERS.values():
+            user = User(email=email, role=role)
+            user.set_password(password)
+            users.append(user)
+        # Un solo INSERT para todos los usuarios; los ids se leen después por email
+        db.session.bulk_save_objects(users)
         db.session.commit()
-        return user
+        ids = dict(db.session.query(User.email, User.id))
+        return {key: ids[email] for key, (email, _, _) in TEST_USERS.items()}
+
+def _mint_token(app, seeded_users, key):
+    """Emite el mismo JWT que /api/auth/login sin pasar por HTTP ni argon2"""
+    _, _, role = TEST_USERS[key]
+    with app.app_context():
+        return create_access_token(
+            identity=seeded_users[key],
+            additional_claims={'role': role.value, 'active': True},
+            expires_delta=timedelta(hours=24)
+        )
 
 @pytest.fixture
-def regular_user(app):
+def admin_user(db_session, seeded_users):
+    """Usuario administrador para pruebas"""
+    return db_session.get(User, seeded_users['admin'])
+
+@pytest.fixture
+def regular_user(db_session, seeded_users):
     """Usuario regular para pruebas"""
-    with app.app_context():
-        user = User(email='user@test.com', role=UserRole.USER)
-        user.set_password('User123!')
-        db.session.add(user)
-        db.session.commit()
-        return user
+    return db_session.get(User, seeded_users['user'])
+
+@pytest.fixture(scope='session')
+def admin_token(app, seeded_users):
+    """Token JWT para usuario administrador (emitido una vez por sesión)"""
+    return _mint_token(app, seeded_users, 'admin')
+
+@pytest.fixture(scope='session')
+def user_token(app, seeded_users):
+    """Token JWT para usuario regular (emitido una vez por sesión)"""
+    return _mint_token(app, seeded_users, 'user')
+
+def _authed_client(app, token):
+    """Cliente sin cookies que envía el token en todas las peticiones"""
+    client = app.test_client(use_cookies=False)
+    client.environ_base['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    return client
 
 @pytest.fixture
-def admin_token(client, admin_user):
-    """Token JWT para usuario administrador"""
-    response = client.post('/api/auth/login', json={
-        'email': 'admin@test.com',
-        'password': 'Admin123!'
-    })
-    return json.loads(response.data)['access_token']
+def admin_client(app, admin_token):
+    """Cliente autenticado como administrador"""
+    return _authed_client(app, admin_token)
 
 @pytest.fixture
-def user_token(client, regular_user):
-    """Token JWT para usuario regular"""
-    response = client.post('/api/auth/login', json={
-        'email': 'user@test.com',
-        'password': 'User123!'
-    })
-    return json.loads(response.data)['access_token']
+def user_client(app, user_token):
+    """Cliente autenticado como usuario regular"""
+    return _authed_client(app, user_token)
+
+# Fecha fija para las pruebas de edad y elegibilidad de los modelos
+FROZEN_TODAY = date(2024, 1, 15)
 
 @pytest.fixture
+def frozen_today(monkeypatch):
+    """Fija la fecha actual que usan los modelos"""
+    monkeypatch.setattr('app.models._today', lambda: FROZEN_TODAY)
+    return FROZEN_TODAY
+
+# Datos de solo lectura: las pruebas que los modifican trabajan sobre una copia
+SAMPLE_DONOR_DATA = MappingProxyType({
+    'first_name': 'Juan',
+    'last_name': 'Pérez',
+    'email': 'juan.perez@test.com',
+    'phone': '1234567890',
+    'birth_date': '1990-01-01',
+    'blood_type': 'O+',
+    'weight': 70.5,
+    'is_eligible': True,
+    'medical_notes': 'Sin observaciones'
+})
+
+@pytest.fixture(scope='module')
 def sample_donor_data():
     """Datos de ejemplo para crear un donante"""
-    return {
-        'first_name': 'Juan',
-        'last_name': 'Pérez',
-        'email': 'juan.perez@test.com',
-        'phone': '1234567890',
-        'birth_date': '1990-01-01',
-        'blood_type': 'O+',
-        'weight': 70.5,
-        'is_eligible': True,
-        'medical_notes': 'Sin observaciones'
-    }
+    return SAMPLE_DONOR_DATA
+
+@pytest.fixture
+def make_donor(db_session, regular_user):
+    """Fábrica de donantes guardados, creados por el usuario regular salvo que se indique otro"""
+    def _make_donor(**overrides):
+        values = {
+            'first_name': 'Test',
+            'last_name': 'Donor',
+            'email': 'test.donor@test.com',
+            'birth_date': date(1990, 1, 1),
+            'blood_type': BloodType.O_POSITIVE,
+            'weight': 70,
+            'created_by': regular_user.id
+        }
+        values.update(overrides)
+        donor = Donor(**values)
+        db_session.add(donor)
+        db_session.flush()
+        return donor
+    return _make_donor
+
+def call_view(app, view, path, payload):
+    """Llama a la vista directamente con una petición fabricada, sin enrutado WSGI"""
+    with app.test_request_context(path, method='POST', json=payload):
+        return view()
 
+@pytest.mark.usefixtures('db_session')
 class TestAuthRoutes:
     """Pruebas para las rutas de autenticación"""
     
@@ -88,35 +198,49 @@ class TestAuthRoutes:
         })
         
         assert response.status_code == 201
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['message'] == 'Usuario registrado exitosamente'
         assert data['user']['email'] == 'nuevo@test.com'
         assert data['user']['role'] == 'usuario'
+        assert data['user']['created_at'] is not None
     
-    def test_register_user_invalid_email(self, client):
+    @pytest.mark.parametrize('email', ['email-invalido', 'a..b@example.com', 'user@-example.com'])
+    def test_register_user_invalid_email(self, app, email):
         """Prueba registro con email inválido"""
-        response = client.post('/api/auth/register', json={
-            'email': 'email-invalido',
+        response = call_view(app, register, '/api/auth/register', {
+            'email': email,
             'password': 'Password123!',
             'role': 'usuario'
         })
         
         assert response.status_code == 400
-        data = json.loads(response.data)
+        data = response.get_json()
         assert 'email inválido' in data['message'].lower()
     
-    def test_register_user_weak_password(self, client):
+    def test_register_user_weak_password(self, app):
         """Prueba registro con contraseña débil"""
-        response = client.post('/api/auth/register', json={
+        response = call_view(app, register, '/api/auth/register', {
             'email': 'test@test.com',
             'password': '123',
             'role': 'usuario'
         })
         
         assert response.status_code == 400
-        data = json.loads(response.data)
+        data = response.get_json()
         assert 'contraseña' in data['message'].lower()
     
+    def test_register_user_invalid_role(self, app):
+        """Prueba registro con rol inválido"""
+        response = call_view(app, register, '/api/auth/register', {
+            'email': 'rol@test.com',
+            'password': 'Password123!',
+            'role': 'superusuario'
+        })
+        
+        assert response.status_code == 400
+        data = response.get_json()
+        assert 'rol inválido' in data['message'].lower()
+    
     def test_register_duplicate_email(self, client, regular_user):
         """Prueba registro con email duplicado"""
         response = client.post('/api/auth/register', json={
@@ -126,7 +250,7 @@ class TestAuthRoutes:
         })
         
         assert response.status_code == 400
-        data = json.loads(response.data)
+        data = response.get_json()
         assert 'ya está registrado' in data['message']
     
     def test_login_success(self, client, regular_user):
@@ -137,9 +261,15 @@ class TestAuthRoutes:
         })
         
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert 'access_token' in data
         assert data['user']['email'] == 'user@test.com'
+        
+        # El token incluye el rol para evitar consultas en rutas protegidas
+        from flask_jwt_extended import decode_token
+        claims = decode_token(data['access_token'])
+        assert claims['role'] == 'usuario'
+        assert claims['active'] is True
     
     def test_login_invalid_credentials(self, client, regular_user):
         """Prueba login con credenciales inválidas"""
@@ -149,17 +279,15 @@ class TestAuthRoutes:
         })
         
         assert response.status_code == 401
-        data = json.loads(response.data)
+        data = response.get_json()
         assert 'contraseña incorrecta' in data['message'].lower()
     
-    def test_get_profile_success(self, client, user_token):
+    def test_get_profile_success(self, user_client):
         """Prueba obtener perfil con token válido"""
-        response = client.get('/api/auth/profile', headers={
-            'Authorization': f'Bearer {user_token}'
-        })
+        response = user_client.get('/api/auth/profile')
         
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['user']['email'] == 'user@test.com'
     
     def test_get_profile_no_token(self, client):
@@ -168,242 +296,444 @@ class TestAuthRoutes:
         
         assert response.status_code == 401
     
-    def test_admin_get_all_users(self, client, admin_token, regular_user):
+    def test_admin_get_all_users(self, admin_client, regular_user):
         """Prueba admin obteniendo todos los usuarios"""
-        response = client.get('/api/auth/users', headers={
-            'Authorization': f'Bearer {admin_token}'
-        })
+        response = admin_client.get('/api/auth/users')
         
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert len(data['users']) >= 2  # admin + regular user
+        assert data['total'] == len(data['users'])
+        assert {'id', 'email', 'role', 'is_active'} <= set(data['users'][0])
     
-    def test_user_get_all_users_forbidden(self, client, user_token):
+    def test_admin_update_user(self, admin_client, regular_user):
+        """Prueba admin actualizando rol y estado de un usuario"""
+        user_id = User.query.filter_by(email='user@test.com').first().id
+        response = admin_client.put(f'/api/auth/users/{user_id}', json={
+            'role': 'administrador',
+            'is_active': False
+        })
+        
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['user']['email'] == 'user@test.com'
+        assert data['user']['role'] == 'administrador'
+        assert data['user']['is_active'] is False
+    
+    def test_admin_update_user_duplicate_email(self, admin_client, regular_user):
+        """Prueba admin asignando un email ya en uso"""
+        user_id = User.query.filter_by(email='user@test.com').first().id
+        response = admin_client.put(f'/api/auth/users/{user_id}', json={
+            'email': 'admin@test.com'
+        })
+        
+        assert response.status_code == 400
+        data = response.get_json()
+        assert 'ya está en uso' in data['message']
+    
+    def test_admin_update_user_invalid_email(self, admin_client, regular_user):
+        """Prueba admin asignando un email con puntos consecutivos"""
+        response = admin_client.put(f'/api/auth/users/{regular_user.id}', json={
+            'email': 'x@exa..mple.com'
+        })
+        
+        assert response.status_code == 400
+        assert 'email inválido' in response.get_json()['message'].lower()
+    
+    def test_admin_demoted_token_cannot_use_admin_routes(self, admin_client, admin_user, regular_user, db_session):
+        """Prueba que un admin degradado o desactivado no usa las rutas de administración con su token antiguo"""
+        admin_user.role = UserRole.USER.value
+        admin_user.is_active = False
+        db_session.commit()
+        
+        response = admin_client.get('/api/auth/users')
+        assert response.status_code == 403
+        
+        response = admin_client.get('/api/donors/statistics')
+        assert response.status_code == 403
+        
+        response = admin_client.put(f'/api/auth/users/{regular_user.id}', json={'is_active': False})
+        assert response.status_code == 403
+        
+        response = admin_client.delete(f'/api/auth/users/{regular_user.id}')
+        assert response.status_code == 403
+        assert db_session.get(User, regular_user.id).is_active
+    
+    def test_admin_update_user_not_found(self, admin_client):
+        """Prueba admin actualizando un usuario inexistente"""
+        response = admin_client.put('/api/auth/users/999', json={
+            'is_active': False
+        })
+        
+        assert response.status_code == 404
+
+    def test_admin_delete_user_with_donors(self, admin_client, regular_user):
+        """Prueba que no se elimina un usuario con donantes y sí uno sin ellos"""
+        user_id = User.query.filter_by(email='user@test.com').first().id
+        db.session.add(Donor(
+            first_name='Ana', last_name='López', email='ana@test.com',
+            birth_date=date(1990, 1, 1), blood_type=BloodType.A_POSITIVE,
+            weight=60.0, created_by=user_id
+        ))
+        db.session.commit()
+        
+        response = admin_client.delete(f'/api/auth/users/{user_id}')
+        assert response.status_code == 400
+        assert response.get_json()['donors_count'] == 1
+        
+        Donor.query.filter_by(created_by=user_id).delete()
+        db.session.commit()
+        response = admin_client.delete(f'/api/auth/users/{user_id}')
+        assert response.status_code == 200
+        
+        response = admin_client.delete(f'/api/auth/users/{user_id}')
+        assert response.status_code == 404
+    
+    def test_admin_delete_self_forbidden(self, admin_client):
+        """Prueba que el admin no puede eliminarse a sí mismo"""
+        admin_id = User.query.filter_by(email='admin@test.com').first().id
+        response = admin_client.delete(f'/api/auth/users/{admin_id}')
+        
+        assert response.status_code == 400
+
+    def test_internal_error_hides_details(self, client, monkeypatch):
+        """Prueba que los errores no controlados no exponen detalles internos"""
+        from sqlalchemy.exc import SQLAlchemyError
+        from app.utils.auth import AuthUtils
+
+        def failing_authenticate(email, password):
+            raise SQLAlchemyError('detalle interno')
+
+        monkeypatch.setattr(AuthUtils, 'authenticate_user', staticmethod(failing_authenticate))
+        response = client.post('/api/auth/login', json={
+            'email': 'user@test.com',
+            'password': 'User123!'
+        })
+
+        assert response.status_code == 500
+        data = response.get_json()
+        assert data == {'message': 'Error interno del servidor'}
+
+    def test_user_get_all_users_forbidden(self, user_client):
         """Prueba usuario regular intentando obtener todos los usuarios"""
+        response = user_client.get('/api/auth/users')
+        
+        assert response.status_code == 403
+    
+    def test_invalid_token_hides_details(self, client):
+        """Prueba que un token inválido no expone el error de la librería JWT"""
         response = client.get('/api/auth/users', headers={
-            'Authorization': f'Bearer {user_token}'
+            'Authorization': 'Bearer token-invalido'
         })
         
-        assert response.status_code == 403
+        assert response.status_code == 401
+        assert response.get_json() == {'message': 'Error de autenticación'}
 
+@pytest.mark.usefixtures('db_session')
 class TestDonorRoutes:
     """Pruebas para las rutas de donantes"""
     
-    def test_create_donor_success(self, client, user_token, sample_donor_data):
+    def test_create_donor_success(self, user_client, sample_donor_data):
         """Prueba creación exitosa de donante"""
-        response = client.post('/api/donors', 
-                             json=sample_donor_data,
-                             headers={'Authorization': f'Bearer {user_token}'})
+        response = user_client.post('/api/donors', json=dict(sample_donor_data))
         
         assert response.status_code == 201
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['message'] == 'Donante registrado exitosamente'
         assert data['donor']['email'] == sample_donor_data['email']
         assert data['donor']['blood_type'] == sample_donor_data['blood_type']
+        assert data['donor']['birth_date'] == sample_donor_data['birth_date']
+        # Mismo formato que datetime.isoformat(): sin sufijo de zona horaria
+        created_at = data['donor']['created_at']
+        assert datetime.fromisoformat(created_at).tzinfo is None
+        assert not created_at.endswith(('Z', '+00:00'))
     
-    def test_create_donor_missing_fields(self, client, user_token):
-        """Prueba creación de donante con campos faltantes"""
-        response = client.post('/api/donors', 
-                             json={'first_name': 'Juan'},
-                             headers={'Authorization': f'Bearer {user_token}'})
+    @pytest.mark.parametrize('patch,needle', [
+        (None, 'errores de validación'),                     # Campos faltantes
+        ({'email': 'email-invalido'}, 'email'),
+        # Menor de 16 años relativo a hoy, para que la prueba no caduque
+        ({'birth_date': (date.today() - timedelta(days=15*365)).isoformat()}, 'al menos 16 años'),
+        ({'weight': 30}, 'peso')                             # Muy bajo
+    ])
+    def test_create_donor_invalid_data(self, user_client, sample_donor_data, patch, needle):
+        """Prueba creación de donante con datos faltantes o inválidos"""
+        body = {**sample_donor_data, **patch} if patch else {'first_name': 'Juan'}
+        response = user_client.post('/api/donors', json=body)
         
         assert response.status_code == 400
-        data = json.loads(response.data)
-        assert 'errores de validación' in data['message'].lower()
+        data = response.get_json()
         assert len(data['errors']) > 0
+        assert any(needle in error.lower() for error in data['errors']) or needle in data['message'].lower()
     
-    def test_create_donor_invalid_email(self, client, user_token, sample_donor_data):
-        """Prueba creación de donante con email inválido"""
-        sample_donor_data['email'] = 'email-invalido'
-        response = client.post('/api/donors', 
-                             json=sample_donor_data,
-                             headers={'Authorization': f'Bearer {user_token}'})
+    def test_create_donor_duplicate_email(self, user_client, sample_donor_data, make_donor):
+        """Prueba creación de donante con email duplicado"""
+        # Crear primer donante
+        make_donor(last_name='User', email=sample_donor_data['email'])
         
-        assert response.status_code == 400
-        data = json.loads(response.data)
-        assert any('email' in error.lower() for error in data['errors'])
-    
-    def test_create_donor_invalid_age(self, client, user_token, sample_donor_data):
-        """Prueba creación de donante con edad inválida"""
-        sample_donor_data['birth_date'] = '2010-01-01'  # Muy joven
-        response = client.post('/api/donors', 
-                             json=sample_donor_data,
-                             headers={'Authorization': f'Bearer {user_token}'})
+        # Intentar crear segundo donante con mismo email
+        response = user_client.post('/api/donors', json=dict(sample_donor_data))
         
-        assert response.status_code == 400
-        data = json.loads(response.data)
-        assert any('edad' in error.lower() for error in data['errors'])
+        assert response.status_code == 409
+        data = response.get_json()
+        assert 'ya existe' in data['message'].lower()
     
-    def test_create_donor_invalid_weight(self, client, user_token, sample_donor_data):
-        """Prueba creación de donante con peso inválido"""
-        sample_donor_data['weight'] = 30  # Muy bajo
-        response = client.post('/api/donors', 
-                             json=sample_donor_data,
-                             headers={'Authorization': f'Bearer {user_token}'})
+    def test_create_donors_bulk(self, admin_client, sample_donor_data, monkeypatch):
+        """Prueba la creación de donantes por lotes con estado por fila"""
+        import dns.resolver
         
-        assert response.status_code == 400
-        data = json.loads(response.data)
-        assert any('peso' in error.lower() for error in data['errors'])
+        # La validación de emails no debe consultar DNS: la prueba funciona sin red
+        def no_network(*args, **kwargs):
+            raise AssertionError('validate_email intentó resolver DNS')
+        monkeypatch.setattr(dns.resolver.Resolver, 'resolve', no_network)
+        
+        second = dict(sample_donor_data, email='maria.lopez@test.com', first_name='María')
+        invalid = dict(sample_donor_data, email='otro@test.com', weight=30)
+        duplicate = dict(sample_donor_data)
+        
+        response = admin_client.post('/api/donors/bulk', json={
+            'donors': [dict(sample_donor_data), second, invalid, duplicate]
+        })
+        
+        assert response.status_code == 201
+        data = response.get_json()
+        assert data['created'] == 2
+        assert data['failed'] == 2
+        assert [r['status'] for r in data['results']] == ['created', 'created', 'error', 'error']
+        assert 'El peso mínimo es 45 kg' in data['results'][2]['errors']
+        assert Donor.query.count() == 2
     
-    def test_create_donor_duplicate_email(self, client, user_token, sample_donor_data, app):
-        """Prueba creación de donante con email duplicado"""
-        # Crear primer donante
-        with app.app_context():
-            donor = Donor(
-                first_name='Test',
-                last_name='User',
-                email=sample_donor_data['email'],
-                birth_date=date(1990, 1, 1),
-                blood_type=BloodType.O_POSITIVE,
-                weight=70,
-                created_by=1
-            )
-            db.session.add(donor)
-            db.session.commit()
+    def test_create_donors_bulk_concurrent_duplicate(self, admin_client, sample_donor_data, make_donor, monkeypatch):
+        """Prueba que un email registrado entre la consulta y el INSERT devuelve 409"""
+        make_donor(email=sample_donor_data['email'])
+        # La consulta de emails ocupados no ve el donante, como si otro proceso lo acabara de crear
+        monkeypatch.setattr(db.session, 'scalars', lambda *args, **kwargs: iter(()))
         
-        # Intentar crear segundo donante con mismo email
-        response = client.post('/api/donors', 
-                             json=sample_donor_data,
-                             headers={'Authorization': f'Bearer {user_token}'})
+        response = admin_client.post('/api/donors/bulk', json={'donors': [dict(sample_donor_data)]})
         
         assert response.status_code == 409
-        data = json.loads(response.data)
-        assert 'ya existe' in data['message'].lower()
+        assert response.get_json() == {'message': 'Ya existe un donante con este email'}
     
-    def test_get_donors_success(self, client, user_token):
-        """Prueba obtener lista de donantes"""
-        response = client.get('/api/donors', headers={
-            'Authorization': f'Bearer {user_token}'
+    def test_create_donors_bulk_malformed_row(self, admin_client, sample_donor_data):
+        """Prueba que una fila con tipos incorrectos se rechaza sin afectar al resto del lote"""
+        malformed = dict(sample_donor_data, email='otro@test.com', phone=5551234567,
+                         medical_notes=['alergia'], is_eligible='si')
+        
+        response = admin_client.post('/api/donors/bulk', json={
+            'donors': [dict(sample_donor_data), malformed]
         })
         
+        assert response.status_code == 201
+        data = response.get_json()
+        assert [r['status'] for r in data['results']] == ['created', 'error']
+        assert data['results'][1]['errors'] == [
+            'El campo phone debe ser texto',
+            'El campo medical_notes debe ser texto',
+            'El campo is_eligible debe ser true o false'
+        ]
+        assert Donor.query.count() == 1
+    
+    def test_create_donors_bulk_other_integrity_error(self, admin_client, sample_donor_data, monkeypatch):
+        """Prueba que una violación distinta del email único no se presenta como 409"""
+        from sqlalchemy.exc import IntegrityError
+        
+        def fail(*args, **kwargs):
+            raise IntegrityError('INSERT', {}, Exception('NOT NULL constraint failed: donors.created_by'))
+        monkeypatch.setattr(db.session, 'bulk_insert_mappings', fail)
+        
+        response = admin_client.post('/api/donors/bulk', json={'donors': [dict(sample_donor_data)]})
+        
+        assert response.status_code == 500
+        assert response.get_json() == {'message': 'Error interno del servidor'}
+    
+    def test_get_donors_success(self, user_client):
+        """Prueba obtener lista de donantes"""
+        response = user_client.get('/api/donors')
+        
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert 'donors' in data
         assert 'pagination' in data
     
+    def test_get_donors_keyset_pagination(self, admin_client):
+        """Prueba la paginación por cursor del listado de donantes"""
+        admin_id = User.query.filter_by(email='admin@test.com').first().id
+        for i in range(3):
+            db.session.add(Donor(
+                first_name='Page', last_name='Donor', email=f'page{i}@test.com',
+                birth_date=date(1990, 1, 1), blood_type=BloodType.O_POSITIVE,
+                weight=70, created_by=admin_id
+            ))
+        db.session.commit()
+        
+        response = admin_client.get('/api/donors?per_page=2')
+        data = response.get_json()
+        assert [d['email'] for d in data['donors']] == ['page0@test.com', 'page1@test.com']
+        cursor = data['pagination']['next_cursor']
+        assert cursor == data['donors'][-1]['id']
+        
+        response = admin_client.get(f'/api/donors?per_page=2&after_id={cursor}')
+        data = response.get_json()
+        assert [d['email'] for d in data['donors']] == ['page2@test.com']
+        assert data['pagination']['next_cursor'] is None
+    
     def test_get_donors_no_token(self, client):
         """Prueba obtener donantes sin token"""
         response = client.get('/api/donors')
         assert response.status_code == 401
     
-    def test_get_donor_by_id(self, client, user_token, app, regular_user):
+    def test_get_donor_by_id(self, user_client, make_donor):
         """Prueba obtener donante específico"""
         # Crear donante
-        with app.app_context():
-            donor = Donor(
-                first_name='Test',
-                last_name='Donor',
-                email='test.donor@test.com',
-                birth_date=date(1990, 1, 1),
-                blood_type=BloodType.O_POSITIVE,
-                weight=70,
-                created_by=regular_user.id
-            )
-            db.session.add(donor)
-            db.session.commit()
-            donor_id = donor.id
-        
-        response = client.get(f'/api/donors/{donor_id}', headers={
-            'Authorization': f'Bearer {user_token}'
-        })
+        donor_id = make_donor().id
+        
+        response = user_client.get(f'/api/donors/{donor_id}')
         
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['donor']['email'] == 'test.donor@test.com'
     
-    def test_update_donor_success(self, client, user_token, app, regular_user):
+    @pytest.mark.parametrize('method,path', [
+        ('get', '/api/donors/999999'),
+        ('put', '/api/donors/999999'),
+        ('delete', '/api/donors/999999'),
+        ('get', '/api/donors/eligibility-check/999999')
+    ])
+    def test_donor_not_found(self, user_client, method, path):
+        """Prueba que un donante inexistente devuelve 404 y no un error interno"""
+        response = getattr(user_client, method)(path, json={'weight': 70})
+        
+        assert response.status_code == 404
+    
+    def test_donor_route_error_hides_details(self, user_client, sample_donor_data, monkeypatch):
+        """Prueba que un fallo inesperado en las rutas de donantes no expone detalles"""
+        def failing_email_taken(*args, **kwargs):
+            raise RuntimeError('detalle interno')
+        monkeypatch.setattr('app.routes.donors.email_taken', failing_email_taken)
+        
+        response = user_client.post('/api/donors', json=dict(sample_donor_data))
+        
+        assert response.status_code == 500
+        assert response.get_json() == {'message': 'Error interno del servidor'}
+    
+    def test_update_donor_success(self, user_client, make_donor):
         """Prueba actualización exitosa de donante"""
         # Crear donante
-        with app.app_context():
-            donor = Donor(
-                first_name='Test',
-                last_name='Donor',
-                email='test.donor@test.com',
-                birth_date=date(1990, 1, 1),
-                blood_type=BloodType.O_POSITIVE,
-                weight=70,
-                created_by=regular_user.id
-            )
-            db.session.add(donor)
-            db.session.commit()
-            donor_id = donor.id
+        donor_id = make_donor().id
         
         update_data = {'first_name': 'Updated', 'weight': 75}
-        response = client.put(f'/api/donors/{donor_id}', 
-                            json=update_data,
-                            headers={'Authorization': f'Bearer {user_token}'})
+        response = user_client.put(f'/api/donors/{donor_id}', json=update_data)
         
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['donor']['first_name'] == 'Updated'
         assert data['donor']['weight'] == 75
     
-    def test_delete_donor_success(self, client, user_token, app, regular_user):
+    def test_delete_donor_success(self, user_client, make_donor):
         """Prueba eliminación exitosa de donante"""
         # Crear donante
-        with app.app_context():
-            donor = Donor(
-                first_name='Test',
-                last_name='Donor',
-                email='test.donor@test.com',
-                birth_date=date(1990, 1, 1),
-                blood_type=BloodType.O_POSITIVE,
-                weight=70,
-                created_by=regular_user.id
-            )
-            db.session.add(donor)
-            db.session.commit()
-            donor_id = donor.id
-        
-        response = client.delete(f'/api/donors/{donor_id}', headers={
-            'Authorization': f'Bearer {user_token}'
-        })
+        donor_id = make_donor().id
+        
+        response = user_client.delete(f'/api/donors/{donor_id}')
         
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert 'eliminado exitosamente' in data['message']
     
-    def test_check_donor_eligibility(self, client, user_token, app, regular_user):
+    def test_check_donor_eligibility(self, user_client, make_donor):
         """Prueba verificación de elegibilidad de donante"""
         # Crear donante elegible
-        with app.app_context():
-            donor = Donor(
-                first_name='Eligible',
-                last_name='Donor',
-                email='eligible@test.com',
-                birth_date=date(1990, 1, 1),
-                blood_type=BloodType.O_POSITIVE,
-                weight=70,
-                is_eligible=True,
-                created_by=regular_user.id
-            )
-            db.session.add(donor)
-            db.session.commit()
-            donor_id = donor.id
-        
-        response = client.get(f'/api/donors/eligibility-check/{donor_id}', headers={
-            'Authorization': f'Bearer {user_token}'
-        })
+        donor_id = make_donor(first_name='Eligible', email='eligible@test.com', is_eligible=True).id
+        
+        response = user_client.get(f'/api/donors/eligibility-check/{donor_id}')
         
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert 'eligible' in data
         assert 'reason' in data
     
-    def test_donor_statistics_admin_only(self, client, admin_token, user_token):
+    def test_donor_statistics_admin_only(self, admin_client, user_client):
         """Prueba que las estadísticas solo son accesibles para admins"""
         # Admin puede acceder
-        response = client.get('/api/donors/statistics', headers={
-            'Authorization': f'Bearer {admin_token}'
-        })
+        response = admin_client.get('/api/donors/statistics')
         assert response.status_code == 200
         
         # Usuario regular no puede acceder
-        response = client.get('/api/donors/statistics', headers={
-            'Authorization': f'Bearer {user_token}'
-        })
+        response = user_client.get('/api/donors/statistics')
         assert response.status_code == 403
 
+    def test_donor_statistics_cache(self, app, admin_client, monkeypatch):
+        """Prueba que las estadísticas se cachean y se invalidan al eliminar un donante"""
+        class FakeRedis:
+            def __init__(self):
+                self.store = {}
+            def get(self, key):
+                return self.store.get(key)
+            def setex(self, key, ttl, value):
+                self.store[key] = value
+            def delete(self, key):
+                self.store.pop(key, None)
+        
+        monkeypatch.setitem(app.extensions, 'redis', FakeRedis())
+        admin_id = User.query.filter_by(email='admin@test.com').first().id
+        donor = Donor(
+            first_name='Cache', last_name='Donor', email='cache@test.com',
+            birth_date=date(1990, 1, 1), blood_type=BloodType.B_POSITIVE,
+            weight=70, created_by=admin_id
+        )
+        db.session.add(donor)
+        db.session.commit()
+        donor_id = donor.id
+        
+        response = admin_client.get('/api/donors/statistics')
+        assert response.get_json()['statistics']['total_donors'] == 1
+        assert 'donor_stats:v1' in app.extensions['redis'].store
+        
+        response = admin_client.delete(f'/api/donors/{donor_id}')
+        assert response.status_code == 200
+        assert 'donor_stats:v1' not in app.extensions['redis'].store
+        
+        response = admin_client.get('/api/donors/statistics')
+        assert response.get_json()['statistics']['total_donors'] == 0
+        
+        response = admin_client.delete(f'/api/donors/{donor_id}')
+        assert response.status_code == 404
+
+    def test_donor_statistics_distribution(self, admin_client):
+        """Prueba la distribución por tipo de sangre y rango de edad"""
+        today = date.today()
+        admin_id = User.query.filter_by(email='admin@test.com').first().id
+        birth_dates = [
+            date(today.year - 20, 1, 1),             # 16-25
+            date(today.year - 26, today.month, min(today.day, 28)),  # 26 recién cumplidos
+            date(today.year - 40, 1, 1),             # 36-45
+        ]
+        for i, birth_date in enumerate(birth_dates):
+            db.session.add(Donor(
+                first_name='Stats',
+                last_name='Donor',
+                email=f'stats{i}@test.com',
+                birth_date=birth_date,
+                blood_type=BloodType.A_POSITIVE if i else BloodType.O_NEGATIVE,
+                weight=70,
+                is_eligible=i != 2,
+                created_by=admin_id
+            ))
+        db.session.commit()
+        
+        response = admin_client.get('/api/donors/statistics')
+        
+        assert response.status_code == 200
+        stats = response.get_json()['statistics']
+        assert stats['total_donors'] == 3
+        assert stats['eligible_donors'] == 2
+        assert stats['ineligible_donors'] == 1
+        assert stats['blood_type_distribution']['A+'] == 2
+        assert stats['blood_type_distribution']['O-'] == 1
+        assert stats['blood_type_distribution']['B+'] == 0
+        assert stats['age_distribution'] == {
+            '16-25': 1, '26-35': 1, '36-45': 1, '46-55': 0, '56-65': 0, '66+': 0
+        }
+
 class TestModels:
     """Pruebas para los modelos de datos"""
     
@@ -414,116 +744,294 @@ class TestModels:
             user.set_password('password123')
             
             assert user.password_hash != 'password123'
+            assert user.password_hash.startswith('$argon2id$v=19$m=8,t=1,')  # coste de pruebas
             assert user.check_password('password123')
             assert not user.check_password('wrong-password')
     
-    def test_user_role_admin_check(self, app):
-        """Prueba verificación de rol de administrador"""
+    def test_user_legacy_password_hash_migration(self, app):
+        """Prueba la migración de hashes de Werkzeug a argon2"""
+        from werkzeug.security import generate_password_hash
+        
         with app.app_context():
-            admin = User(email='admin@test.com', role=UserRole.ADMIN)
-            user = User(email='user@test.com', role=UserRole.USER)
+            user = User(email='legacy@test.com')
+            # Pocas iteraciones: solo interesa el formato pbkdf2 del hash heredado
+            user.password_hash = generate_password_hash('password123', method='pbkdf2:sha256:1000')
             
-            assert admin.is_admin()
-            assert not user.is_admin()
+            assert not user.check_password('wrong-password')
+            assert user.password_hash.startswith('pbkdf2:')
+            assert user.check_password('password123')
+            assert user.password_hash.startswith('$argon2')
+            assert user.check_password('password123')
+    
+    def test_user_password_change_invalidates_cache(self, app):
+        """Prueba que la verificación memorizada no sobrevive a un cambio de contraseña"""
+        user = User(email='cache@test.com')
+        user.set_password('password123')
+        
+        assert user.check_password('password123')
+        assert user.check_password('password123')
+        
+        user.set_password('otra-clave456')
+        assert not user.check_password('password123')
+        assert user.check_password('otra-clave456')
     
-    def test_donor_age_calculation(self, app):
+    def test_user_role_admin_check(self):
+        """Prueba verificación de rol de administrador"""
+        admin = User(email='admin@test.com', role=UserRole.ADMIN)
+        user = User(email='user@test.com', role=UserRole.USER)
+        
+        assert not has_app_context()  # Sin base de datos ni contexto de aplicación
+        assert admin.is_admin()
+        assert not user.is_admin()
+    
+    def test_donor_age_calculation(self, frozen_today):
         """Prueba cálculo de edad del donante"""
-        with app.app_context():
-            birth_date = date(1990, 1, 1)
-            donor = Donor(
-                first_name='Test',
-                last_name='Donor',
-                email='test@test.com',
-                birth_date=birth_date,
-                blood_type=BloodType.O_POSITIVE,
-                weight=70,
-                created_by=1
-            )
-            
-            age = donor.get_age()
-            expected_age = date.today().year - 1990
-            assert age == expected_age or age == expected_age - 1  # Dependiendo del día
+        birth_date = date(1990, 1, 1)
+        donor = Donor(
+            first_name='Test',
+            last_name='Donor',
+            email='test@test.com',
+            birth_date=birth_date,
+            blood_type=BloodType.O_POSITIVE,
+            weight=70,
+            created_by=1
+        )
+        
+        assert donor.get_age() == 34
+        assert donor.get_age(date(2023, 12, 31)) == 33  # Víspera del cumpleaños
     
-    def test_donor_eligibility_age_limits(self, app):
-        """Prueba límites de edad para elegibilidad"""
-        with app.app_context():
-            # Donante muy joven (17 años)
-            young_donor = Donor(
-                first_name='Young',
-                last_name='Donor',
-                email='young@test.com',
-                birth_date=date.today() - timedelta(days=17*365),
-                blood_type=BloodType.O_POSITIVE,
-                weight=70,
-                created_by=1
-            )
-            
-            eligible, reason = young_donor.is_eligible_for_donation()
-            assert not eligible
-            assert 'edad' in reason.lower()
+    @pytest.mark.parametrize('overrides,needle', [
+        ({'birth_date': date(2006, 6, 1)}, 'edad'),                              # 17 años
+        ({'weight': 45}, 'peso'),                                                 # Bajo el límite
+        ({'last_donation_date': FROZEN_TODAY - timedelta(days=30)}, 'esperar')   # Hace 30 días
+    ])
+    def test_donor_eligibility_limits(self, frozen_today, overrides, needle):
+        """Prueba los límites de edad, peso y tiempo entre donaciones"""
+        values = {
+            'first_name': 'Test',
+            'last_name': 'Donor',
+            'email': 'limits@test.com',
+            'birth_date': date(1990, 1, 1),
+            'blood_type': BloodType.O_POSITIVE,
+            'weight': 70,
+            'created_by': 1
+        }
+        values.update(overrides)
+        
+        eligible, reason = Donor(**values).is_eligible_for_donation()
+        assert not eligible
+        assert needle in reason.lower()
     
-    def test_donor_eligibility_weight_limit(self, app):
-        """Prueba límite de peso para elegibilidad"""
-        with app.app_context():
-            low_weight_donor = Donor(
-                first_name='Light',
-                last_name='Donor',
-                email='light@test.com',
-                birth_date=date(1990, 1, 1),
-                blood_type=BloodType.O_POSITIVE,
-                weight=45,  # Bajo el límite
-                created_by=1
-            )
-            
-            eligible, reason = low_weight_donor.is_eligible_for_donation()
-            assert not eligible
-            assert 'peso' in reason.lower()
+    def test_new_donor_is_eligible_by_default(self, frozen_today):
+        """Prueba que un donante sin guardar ya tiene is_eligible=True"""
+        donor = Donor(
+            first_name='Test',
+            last_name='Donor',
+            email='default@test.com',
+            birth_date=date(1990, 1, 1),
+            blood_type=BloodType.O_POSITIVE,
+            weight=70,
+            created_by=1
+        )
+        
+        assert donor.is_eligible is True
+        assert donor.is_eligible_for_donation() == (True, 'Elegible para donación')
     
-    def test_donor_eligibility_recent_donation(self, app):
-        """Prueba elegibilidad con donación reciente"""
-        with app.app_context():
-            recent_donor = Donor(
-                first_name='Recent',
-                last_name='Donor',
-                email='recent@test.com',
-                birth_date=date(1990, 1, 1),
-                blood_type=BloodType.O_POSITIVE,
-                weight=70,
-                last_donation_date=date.today() - timedelta(days=30),  # Hace 30 días
-                created_by=1
-            )
-            
-            eligible, reason = recent_donor.is_eligible_for_donation()
-            assert not eligible
-            assert 'esperar' in reason.lower()
+    def test_timestamps_sent_on_insert(self, db_session):
+        """Prueba que el INSERT incluye los timestamps aunque la tabla no tenga DEFAULT"""
+        statements = []
+        
+        @event.listens_for(db_session.connection(), 'before_cursor_execute')
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        user = User(email='timestamps@test.com', password_hash='x')
+        db_session.add(user)
+        db_session.flush()
+        
+        insert = next(s for s in statements if s.startswith('INSERT INTO users'))
+        assert 'created_at' in insert and 'updated_at' in insert
+        assert isinstance(user.created_at, datetime)
+
+@pytest.mark.usefixtures('db_session')
+class TestCommands:
+    """Pruebas para los comandos de inicialización"""
+    
+    def test_init_admin_creates_admin_once(self, app, runner, monkeypatch):
+        """Prueba que init-admin crea el administrador solo una vez"""
+        monkeypatch.setenv('ADMIN_EMAIL', 'root@test.com')
+        
+        result = runner.invoke(args=['init-admin'])
+        assert 'creado' in result.output
+        admin = User.query.filter_by(email='root@test.com').first()
+        assert admin is not None and admin.is_admin()
+        
+        result = runner.invoke(args=['init-admin'])
+        assert 'ya existe' in result.output
+        assert User.query.filter_by(email='root@test.com').count() == 1
+
+    def test_migrate_enum_values(self, runner, db_session, admin_user):
+        """Prueba que los nombres heredados de db.Enum se convierten en valores"""
+        from sqlalchemy import text
+        
+        # Filas como las dejaba db.Enum; el esquema actual las rechazaría por su CHECK
+        db_session.execute(text('PRAGMA ignore_check_constraints = ON'))
+        try:
+            db_session.execute(text(
+                "INSERT INTO users (email, password_hash, role, is_active) "
+                "VALUES ('legacy-admin@test.com', 'x', 'ADMIN', 1)"
+            ))
+            user_id = db_session.execute(text(
+                "SELECT id FROM users WHERE email = 'legacy-admin@test.com'"
+            )).scalar()
+            db_session.execute(text(
+                "INSERT INTO donors (first_name, last_name, email, birth_date, blood_type, weight, is_eligible, created_by) "
+                f"VALUES ('Ana', 'Legacy', 'legacy-donor@test.com', '1990-01-01', 'AB_NEGATIVE', 60, 1, {user_id})"
+            ))
+        finally:
+            db_session.execute(text('PRAGMA ignore_check_constraints = OFF'))
+        
+        result = runner.invoke(args=['migrate-enum-values'])
+        assert 'migrados' in result.output
+        
+        user = User.query.filter_by(email='legacy-admin@test.com').one()
+        assert user.role == 'administrador' and user.is_admin()
+        assert Donor.query.filter_by(email='legacy-donor@test.com').one().blood_type == 'AB-'
+        # Las filas que ya guardaban valores no cambian
+        assert db_session.get(User, admin_user.id).role == 'administrador'
 
 class TestUtilities:
     """Pruebas para utilidades y funciones auxiliares"""
     
-    def test_password_validation(self):
+    @pytest.mark.parametrize('password,expected,needle', [
+        ('Password123!', True, None),
+        ('P1!', False, 'caracteres'),            # Muy corta
+        ('password123!', False, 'mayúscula'),
+        ('PASSWORD123!', False, 'minúscula'),
+        ('Password!', False, 'número'),
+        ('Aa1' * 43, False, '128'),              # Demasiado larga
+        # Letras no ASCII cuentan como mayúsculas y minúsculas
+        ('Ñandú2024', True, None),
+        ('ñandú2024', False, 'mayúscula')
+    ])
+    def test_password_validation(self, password, expected, needle):
         """Prueba validación de contraseñas"""
         from app.utils.auth import AuthUtils
         
-        # Contraseña válida
-        valid, msg = AuthUtils.validate_password('Password123!')
-        assert valid
-        
-        # Contraseña muy corta
-        valid, msg = AuthUtils.validate_password('P1!')
-        assert not valid
-        assert 'caracteres' in msg
-        
-        # Sin mayúscula
-        valid, msg = AuthUtils.validate_password('password123!')
-        assert not valid
-        assert 'mayúscula' in msg
-        
-        # Sin minúscula
-        valid, msg = AuthUtils.validate_password('PASSWORD123!')
-        assert not valid
-        assert 'minúscula' in msg
-        
-        # Sin número
-        valid, msg = AuthUtils.validate_password('Password!')
-        assert not valid
-        assert 'número' in msg
\ No newline at end of file
+        valid, msg = AuthUtils.validate_password(password)
+        assert valid is expected
+        assert needle is None or needle in msg
+    
+    @pytest.mark.parametrize('email,expected', [
+        ('user@example.com', True),
+        ("o'neil@example.com", True),        # Aceptado por email_validator, no por la regex
+        ('josé@ejemplo.es', True),
+        ('a..b@example.com', False),
+        ('.a@example.com', False),
+        ('x@exa..mple.com', False),
+        ('user@-example.com', False),
+        ('user@example', False)
+    ])
+    def test_validate_email_fast(self, email, expected):
+        """Prueba que la regex solo acelera los casos válidos y el resto decide email_validator"""
+        from app.routes.auth import _validate_email_fast
+        
+        assert _validate_email_fast(email) is expected
+    
+    def test_donor_data_validation_parses_dates(self):
+        """Prueba que la validación devuelve los datos recortados y convertidos"""
+        from app.routes.donors import validate_donor_data
+        
+        errors, clean = validate_donor_data({
+            'first_name': '  Ana ',
+            'birth_date': '1990-05-17',
+            'last_donation_date': '2020-01-02',
+            'weight': '61.5'
+        }, is_update=True)
+        assert errors == []
+        assert clean == {
+            'first_name': 'Ana',
+            'birth_date': date(1990, 5, 17),
+            'last_donation_date': date(2020, 1, 2),
+            'weight': 61.5
+        }
+        
+        errors, clean = validate_donor_data({'birth_date': '17/05/1990'}, is_update=True)
+        assert 'Formato de fecha inválido. Use YYYY-MM-DD' in errors
+    
+    def test_donor_email_taken(self, app, admin_user):
+        """Prueba la verificación de unicidad del email de donantes"""
+        from app.routes.donors import email_taken
+        
+        admin_id = User.query.filter_by(email='admin@test.com').first().id
+        donor = Donor(
+            first_name='Unico', last_name='Donor', email='unico@test.com',
+            birth_date=date(1990, 1, 1), blood_type=BloodType.O_POSITIVE,
+            weight=70, created_by=admin_id
+        )
+        db.session.add(donor)
+        db.session.commit()
+        
+        assert email_taken('unico@test.com')
+        assert not email_taken('unico@test.com', exclude_id=donor.id)
+        assert not email_taken('otro@test.com')
+    
+    def test_donor_data_validation_exact_age(self):
+        """Prueba que la edad mínima se calcula por años cumplidos"""
+        from app.routes.donors import validate_donor_data
+        
+        today = date.today()
+        sixteenth_birthday = date(today.year - 16, today.month, min(today.day, 28))
+        
+        errors, _ = validate_donor_data({'birth_date': sixteenth_birthday.isoformat()}, is_update=True)
+        assert errors == []
+        
+        # Cumple 16 en dos días: (hoy - nacimiento).days // 365 ya daría 16
+        birth_date = (sixteenth_birthday + timedelta(days=2)).isoformat()
+        errors, _ = validate_donor_data({'birth_date': birth_date}, is_update=True)
+        assert 'El donante debe tener al menos 16 años' in errors
+    
+    def test_donor_data_validation_normalizes_email(self):
+        """Prueba que el email del donante se normaliza una sola vez"""
+        from app.routes.donors import validate_donor_data
+        
+        errors, clean = validate_donor_data({'email': ' Juan.Perez@TEST.com '}, is_update=True)
+        assert errors == []
+        assert clean['email'] == 'juan.perez@test.com'
+    
+    def test_role_required_uses_token_claims(self, app, user_token, admin_token):
+        """Prueba que role_required decide con el rol incluido en el token"""
+        from app.utils.auth import role_required
+        
+        @role_required(UserRole.USER)
+        def only_users():
+            return 'ok'
+        
+        with app.test_request_context(headers={'Authorization': f'Bearer {user_token}'}):
+            assert only_users() == 'ok'
+        
+        with app.test_request_context(headers={'Authorization': f'Bearer {admin_token}'}):
+            response, status = only_users()
+            assert status == 403
+    
+    def test_inactive_claim_is_refused(self, app, seeded_users):
+        """Prueba que un token emitido con active=False no pasa los decoradores"""
+        from app.utils.auth import admin_required, role_required
+        
+        @admin_required
+        def only_admins():
+            return 'ok'
+        
+        @role_required(UserRole.USER)
+        def only_users():
+            return 'ok'
+        
+        for key, view in (('admin', only_admins), ('user', only_users)):
+            with app.app_context():
+                token = create_access_token(
+                    identity=seeded_users[key],
+                    additional_claims={'role': TEST_USERS[key][2].value, 'active': False}
+                )
+            with app.test_request_context(headers={'Authorization': f'Bearer {token}'}):
+                response, status = view()
+                assert status == 403
@@ -15,19 +15,20 @@ def test_basic_import():
     except Exception as e:
         pytest.fail(f"Import failed: {e}")
 
-def test_password_validation():
+PASSWORD_CASES = [
+    ('Password123!', True, None),
+    ('weak', False, 'caracteres')
+]
+
+@pytest.mark.parametrize('password,expected,needle', PASSWORD_CASES)
+def test_password_validation(password, expected, needle):
     """Test password validation utility"""
     try:
         from app.utils.auth import AuthUtils
         
-        # Test valid password
-        valid, msg = AuthUtils.validate_password('Password123!')
-        assert valid is True
-        
-        # Test invalid password
-        valid, msg = AuthUtils.validate_password('weak')
-        assert valid is False
-        assert 'caracteres' in msg
+        valid, msg = AuthUtils.validate_password(password)
+        assert valid is expected
+        assert needle is None or needle in msg
         
         print("Password validation works")
     except Exception as e:
@@ -35,5 +36,6 @@ def test_password_validation():
 
 if __name__ == "__main__":
     test_basic_import()
-    test_password_validation()
+    for case in PASSWORD_CASES:
+        test_password_validation(*case)
     print("All basic tests passed!")
\ No newline at end of file
@@ -0,0 +1,69 @@
+import pytest
+import sys
+import os
+from datetime import date, timedelta
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Las comprobaciones de demo_tests.py como pruebas de pytest; el script
+# sigue ejecutándose con `python demo_tests.py` sin depender de pytest
+from demo_tests import (
+    AuthUtils, BloodType, Donor, User, UserRole,
+    validate_donor_data, validate_email, _BLOOD_VALUES, _EXPECTED_BLOOD
+)
+
+@pytest.mark.parametrize("password,ok", [
+    ("Password123!", True),
+    ("weak", False),
+    ("password123!", False),
+    ("PASSWORD123!", False),
+    ("Password!", False),
+])
+def test_password_validation(password, ok):
+    assert AuthUtils.validate_password(password)[0] is ok
+
+def test_user_creation():
+    user = User("admin@test.com", UserRole.ADMIN)
+    user.set_password("Admin123!")
+    assert user.is_admin()
+    assert user.check_password("Admin123!")
+
+@pytest.mark.parametrize("data,valid", [
+    ({'first_name': 'Juan', 'last_name': 'Pérez', 'email': 'juan.perez@test.com',
+      'birth_date': '1990-01-01', 'blood_type': 'O+', 'weight': 70}, True),
+    ({'first_name': 'A', 'email': 'email-invalido', 'birth_date': '2010-01-01', 'weight': 30}, False),
+])
+def test_donor_data_validation(data, valid):
+    assert (not validate_donor_data(data)) is valid
+
+@pytest.mark.parametrize("birth_date,weight,last_donation_days,eligible,reason", [
+    (date(1985, 3, 15), 65, None, True, "elegible"),
+    (date.today() - timedelta(days=17*365), 70, None, False, "edad"),
+    (date(1990, 1, 1), 45, None, False, "peso"),
+    (date(1990, 1, 1), 70, 30, False, "esperar"),
+])
+def test_donor_eligibility(birth_date, weight, last_donation_days, eligible, reason):
+    donor = Donor("Ana", "García", "ana@test.com", birth_date, BloodType.A_POSITIVE, weight, created_by=1)
+    if last_donation_days is not None:
+        donor.last_donation_date = date.today() - timedelta(days=last_donation_days)
+    result, message = donor.is_eligible_for_donation()
+    assert result is eligible
+    assert reason in message.lower()
+
+def test_blood_types():
+    assert _BLOOD_VALUES == _EXPECTED_BLOOD
+
+@pytest.mark.parametrize("email,valid", [
+    ("test@example.com", True),
+    ("user.name@domain.co.uk", True),
+    ("admin123@test-site.org", True),
+    ("invalid-email", False),
+    ("@domain.com", False),
+    ("user@", False),
+    ("user.domain", False),
+])
+def test_email_validation(email, valid):
+    assert validate_email(email) is valid
+
+def test_user_roles():
+    assert User("admin@test.com", UserRole.ADMIN).is_admin()
+    assert not User("user@test.com", UserRole.USER).is_admin()